@@ -8,14 +8,15 @@ from alembic import context
 # Додаємо шлях до кореневого каталогу проєкту, щоб коректно імпортувати `config.py`
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-# Імпортуємо змінну підключення до бази даних
-from app.config import SQLALCHEMY_DATABASE_URL, Base  # Імпортуємо Base, щоб Alembic міг бачити моделі
+# Імпортуємо налаштування підключення до бази даних
+from app.config import settings
+from app.database.models import Base  # Імпортуємо Base, щоб Alembic міг бачити моделі
 
 # Отримуємо конфігурацію Alembic
 config = context.config
 
 # Встановлюємо URL бази даних у конфігурацію Alembic
-config.set_main_option("sqlalchemy.url", SQLALCHEMY_DATABASE_URL)
+config.set_main_option("sqlalchemy.url", settings.database_url)
 
 # Налаштування логування Alembic
 if config.config_file_name is not None:
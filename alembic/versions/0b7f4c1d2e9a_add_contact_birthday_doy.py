@@ -0,0 +1,36 @@
+"""Add indexed birthday day-of-year to contacts
+
+Revision ID: 0b7f4c1d2e9a
+Revises: 5e2869562d68
+Create Date: 2026-10-18 10:03:17.542981
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0b7f4c1d2e9a'
+down_revision: Union[str, None] = '5e2869562d68'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('contacts', sa.Column('birthday_doy', sa.SmallInteger(), nullable=True))
+    # День року рахується у високосному 2000 році, як і в app.services.utils.birthday_day_of_year
+    op.execute(
+        "UPDATE contacts SET birthday_doy = EXTRACT(DOY FROM make_date(2000, "
+        "EXTRACT(MONTH FROM birthday)::int, EXTRACT(DAY FROM birthday)::int)) "
+        "WHERE birthday IS NOT NULL"
+    )
+    op.create_index('ix_contacts_user_birthday_doy', 'contacts', ['user_id', 'birthday_doy'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_contacts_user_birthday_doy', table_name='contacts')
+    op.drop_column('contacts', 'birthday_doy')
@@ -0,0 +1,159 @@
+"""Add per-row contact versions and soft-delete tombstones for delta sync
+
+Revision ID: 3f9c2d7a1b64
+Revises: e57b19d0a6c3
+Create Date: 2026-10-18 16:02:11.418305
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f9c2d7a1b64'
+down_revision: Union[str, None] = 'e57b19d0a6c3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Версії беруться з однієї послідовності на всі контакти, тож int колись закінчиться
+    op.execute("CREATE SEQUENCE contacts_version_seq AS bigint")
+    op.add_column('contacts', sa.Column('version', sa.BigInteger(), nullable=False, server_default='0'))
+    op.add_column('contacts', sa.Column('deleted_at', sa.DateTime(), nullable=True))
+    op.add_column('users', sa.Column('contacts_purged_version', sa.BigInteger(), nullable=False, server_default='0'))
+    op.alter_column('users', 'contacts_version', type_=sa.BigInteger(), existing_nullable=False)
+
+    op.execute("DROP TRIGGER contacts_version_delete ON contacts")
+    op.execute("DROP TRIGGER contacts_version_update ON contacts")
+    op.execute("DROP TRIGGER contacts_version_insert ON contacts")
+    op.execute("DROP FUNCTION bump_contacts_version()")
+
+    # Послідовність стартує вище за наявні лічильники: інакше нова версія не змінила б contacts_version і ETag
+    op.execute("SELECT setval('contacts_version_seq', GREATEST(max(contacts_version), 1)) FROM users")
+    op.execute("UPDATE contacts SET version = nextval('contacts_version_seq')")
+    op.execute("""
+        UPDATE users SET contacts_version = GREATEST(users.contacts_version, changed.version)
+        FROM (SELECT user_id, max(version) AS version FROM contacts GROUP BY user_id) AS changed
+        WHERE users.id = changed.user_id
+    """)
+
+    # Кожен змінений рядок отримує власну версію з послідовності. Рядок користувача блокується до commit
+    # (без перезапису - FOR NO KEY UPDATE, як у самого UPDATE users), тож записи одного користувача
+    # серіалізуються і його закомічені версії завжди утворюють префікс: sync "усе після N" не пропустить
+    # транзакцію, що закомітилась пізніше. Повторне блокування в тій самій транзакції нічого не пише.
+    # Застосунок блокує рядок users ще до рядків контактів (crud._user_locked), інакше пачка і поодинокий
+    # запис того ж користувача могли б взаємно заблокуватися; тут блокування - страховка для сирого SQL.
+    # Видалення тепер - UPDATE deleted_at; фізичний DELETE робить лише компактизація, і версію він не змінює.
+    op.execute("""
+        CREATE FUNCTION stamp_contact_version() RETURNS trigger AS $$
+        BEGIN
+            PERFORM 1 FROM users WHERE id = NEW.user_id FOR NO KEY UPDATE;
+            NEW.version := nextval('contacts_version_seq');
+            RETURN NEW;
+        END
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+        CREATE TRIGGER contacts_version_stamp BEFORE INSERT OR UPDATE ON contacts
+        FOR EACH ROW EXECUTE FUNCTION stamp_contact_version()
+    """)
+    # High-water mark користувача - один UPDATE на оператор, а не на кожен рядок пачки
+    op.execute("""
+        CREATE FUNCTION bump_contacts_version() RETURNS trigger AS $$
+        BEGIN
+            UPDATE users SET contacts_version = GREATEST(users.contacts_version, changed.version)
+            FROM (SELECT user_id, max(version) AS version FROM new_rows GROUP BY user_id) AS changed
+            WHERE users.id = changed.user_id;
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+        CREATE TRIGGER contacts_version_insert AFTER INSERT ON contacts
+        REFERENCING NEW TABLE AS new_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION bump_contacts_version()
+    """)
+    op.execute("""
+        CREATE TRIGGER contacts_version_update AFTER UPDATE ON contacts
+        REFERENCING NEW TABLE AS new_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION bump_contacts_version()
+    """)
+
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'uq_contacts_user_version', 'contacts', ['user_id', 'version'],
+            unique=True, postgresql_concurrently=True, if_not_exists=True,
+        )
+        # Email унікальний лише серед живих контактів: після видалення його можна додати знову
+        op.create_index(
+            'uq_contacts_user_email_live', 'contacts', ['user_id', 'email'],
+            unique=True, postgresql_where=sa.text('deleted_at IS NULL'),
+            postgresql_concurrently=True, if_not_exists=True,
+        )
+        op.create_index(
+            'ix_contacts_deleted_at', 'contacts', ['deleted_at'],
+            postgresql_where=sa.text('deleted_at IS NOT NULL'),
+            postgresql_concurrently=True, if_not_exists=True,
+        )
+        op.drop_index('uq_contacts_user_email', table_name='contacts', postgresql_concurrently=True, if_exists=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DELETE FROM contacts WHERE deleted_at IS NOT NULL")
+
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'uq_contacts_user_email', 'contacts', ['user_id', 'email'],
+            unique=True, postgresql_concurrently=True, if_not_exists=True,
+        )
+        op.drop_index('ix_contacts_deleted_at', table_name='contacts', postgresql_concurrently=True, if_exists=True)
+        op.drop_index('uq_contacts_user_email_live', table_name='contacts', postgresql_concurrently=True, if_exists=True)
+        op.drop_index('uq_contacts_user_version', table_name='contacts', postgresql_concurrently=True, if_exists=True)
+
+    op.execute("DROP TRIGGER IF EXISTS contacts_version_update ON contacts")
+    op.execute("DROP TRIGGER IF EXISTS contacts_version_insert ON contacts")
+    op.execute("DROP FUNCTION IF EXISTS bump_contacts_version()")
+    op.execute("DROP TRIGGER IF EXISTS contacts_version_stamp ON contacts")
+    op.execute("DROP FUNCTION IF EXISTS stamp_contact_version()")
+    op.execute("""
+        CREATE FUNCTION bump_contacts_version() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP = 'INSERT' THEN
+                UPDATE users SET contacts_version = contacts_version + 1
+                WHERE id IN (SELECT user_id FROM new_rows);
+            ELSIF TG_OP = 'UPDATE' THEN
+                UPDATE users SET contacts_version = contacts_version + 1
+                WHERE id IN (SELECT user_id FROM new_rows UNION SELECT user_id FROM old_rows);
+            ELSE
+                UPDATE users SET contacts_version = contacts_version + 1
+                WHERE id IN (SELECT user_id FROM old_rows);
+            END IF;
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+        CREATE TRIGGER contacts_version_insert AFTER INSERT ON contacts
+        REFERENCING NEW TABLE AS new_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION bump_contacts_version()
+    """)
+    op.execute("""
+        CREATE TRIGGER contacts_version_update AFTER UPDATE ON contacts
+        REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION bump_contacts_version()
+    """)
+    op.execute("""
+        CREATE TRIGGER contacts_version_delete AFTER DELETE ON contacts
+        REFERENCING OLD TABLE AS old_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION bump_contacts_version()
+    """)
+    op.drop_column('users', 'contacts_purged_version')
+    op.drop_column('contacts', 'deleted_at')
+    op.drop_column('contacts', 'version')
+    op.alter_column('users', 'contacts_version', type_=sa.Integer(), existing_nullable=False)
+    op.execute("DROP SEQUENCE contacts_version_seq")
@@ -0,0 +1,64 @@
+"""Add contact search columns and trigram/full-text indexes
+
+Revision ID: 5e2869562d68
+Revises: 6884211b0545
+Create Date: 2026-10-18 09:12:41.318204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5e2869562d68'
+down_revision: Union[str, None] = '6884211b0545'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+SEARCH_DOCUMENT = (
+    "coalesce(first_name, '') || ' ' || coalesce(last_name, '') || ' ' || coalesce(email, '') "
+    "|| ' ' || coalesce(phone, '') || ' ' || coalesce(extra_info, '')"
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    op.execute("CREATE EXTENSION IF NOT EXISTS btree_gin")
+
+    # Увага: STORED generated-колонки переписують contacts під ACCESS EXCLUSIVE - на великій таблиці
+    # запускати у вікно обслуговування. Індекси нижче вже не блокують запис (CONCURRENTLY).
+    op.add_column('contacts', sa.Column(
+        'search_vector',
+        postgresql.TSVECTOR(),
+        sa.Computed(f"to_tsvector('simple'::regconfig, {SEARCH_DOCUMENT})", persisted=True),
+    ))
+    op.add_column('contacts', sa.Column(
+        'search_text',
+        sa.Text(),
+        sa.Computed(f"lower({SEARCH_DOCUMENT})", persisted=True),
+    ))
+
+    # user_id у складі GIN-індексів (btree_gin), щоб пошук одразу обмежувався контактами користувача
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_contacts_user_search_vector', 'contacts', ['user_id', 'search_vector'],
+            postgresql_using='gin', postgresql_concurrently=True, if_not_exists=True,
+        )
+        op.create_index(
+            'ix_contacts_user_search_text', 'contacts', ['user_id', 'search_text'],
+            postgresql_using='gin', postgresql_ops={'search_text': 'gin_trgm_ops'},
+            postgresql_concurrently=True, if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_contacts_user_search_text', table_name='contacts', postgresql_concurrently=True, if_exists=True)
+        op.drop_index('ix_contacts_user_search_vector', table_name='contacts', postgresql_concurrently=True, if_exists=True)
+    op.drop_column('contacts', 'search_text')
+    op.drop_column('contacts', 'search_vector')
@@ -0,0 +1,49 @@
+"""Add composite contacts indexes and per-user email uniqueness
+
+Revision ID: c41e8a7f3b25
+Revises: 0b7f4c1d2e9a
+Create Date: 2026-10-18 10:41:52.907314
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c41e8a7f3b25'
+down_revision: Union[str, None] = '0b7f4c1d2e9a'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # CONCURRENTLY не працює всередині транзакції; індекси будуються без блокування запису в таблицю.
+    # if_not_exists дозволяє перезапустити міграцію після збою (невалідний індекс треба видалити вручну).
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_contacts_user_id_id', 'contacts', ['user_id', 'id'],
+            unique=False, postgresql_concurrently=True, if_not_exists=True,
+        )
+        op.create_index(
+            'ix_contacts_user_last_first', 'contacts', ['user_id', 'last_name', 'first_name'],
+            unique=False, postgresql_concurrently=True, if_not_exists=True,
+        )
+        op.create_index(
+            'uq_contacts_user_email', 'contacts', ['user_id', 'email'],
+            unique=True, postgresql_concurrently=True, if_not_exists=True,
+        )
+
+    op.drop_constraint('contacts_email_key', 'contacts', type_='unique')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.create_unique_constraint('contacts_email_key', 'contacts', ['email'])
+
+    with op.get_context().autocommit_block():
+        op.drop_index('uq_contacts_user_email', table_name='contacts', postgresql_concurrently=True, if_exists=True)
+        op.drop_index('ix_contacts_user_last_first', table_name='contacts', postgresql_concurrently=True, if_exists=True)
+        op.drop_index('ix_contacts_user_id_id', table_name='contacts', postgresql_concurrently=True, if_exists=True)
@@ -0,0 +1,73 @@
+"""Add contacts.updated_at and per-user contacts_version
+
+Revision ID: e57b19d0a6c3
+Revises: 9d3a6b2c8f14
+Create Date: 2026-10-18 12:34:50.664017
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e57b19d0a6c3'
+down_revision: Union[str, None] = '9d3a6b2c8f14'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('contacts', sa.Column(
+        'updated_at', sa.DateTime(), nullable=True, server_default=sa.text("timezone('utc', now())"),
+    ))
+    op.add_column('users', sa.Column(
+        'contacts_version', sa.Integer(), nullable=False, server_default='0',
+    ))
+
+    # Лічильник змінюється тригерами рівня statement, тому запис контактів не потребує окремого запиту
+    # з застосунку, а масовий INSERT/UPDATE/DELETE збільшує версію один раз.
+    op.execute("""
+        CREATE FUNCTION bump_contacts_version() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP = 'INSERT' THEN
+                UPDATE users SET contacts_version = contacts_version + 1
+                WHERE id IN (SELECT user_id FROM new_rows);
+            ELSIF TG_OP = 'UPDATE' THEN
+                UPDATE users SET contacts_version = contacts_version + 1
+                WHERE id IN (SELECT user_id FROM new_rows UNION SELECT user_id FROM old_rows);
+            ELSE
+                UPDATE users SET contacts_version = contacts_version + 1
+                WHERE id IN (SELECT user_id FROM old_rows);
+            END IF;
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+        CREATE TRIGGER contacts_version_insert AFTER INSERT ON contacts
+        REFERENCING NEW TABLE AS new_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION bump_contacts_version()
+    """)
+    op.execute("""
+        CREATE TRIGGER contacts_version_update AFTER UPDATE ON contacts
+        REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION bump_contacts_version()
+    """)
+    op.execute("""
+        CREATE TRIGGER contacts_version_delete AFTER DELETE ON contacts
+        REFERENCING OLD TABLE AS old_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION bump_contacts_version()
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP TRIGGER IF EXISTS contacts_version_delete ON contacts")
+    op.execute("DROP TRIGGER IF EXISTS contacts_version_update ON contacts")
+    op.execute("DROP TRIGGER IF EXISTS contacts_version_insert ON contacts")
+    op.execute("DROP FUNCTION IF EXISTS bump_contacts_version()")
+    op.drop_column('users', 'contacts_version')
+    op.drop_column('contacts', 'updated_at')
@@ -1,35 +1,204 @@
+import ipaddress
 import os
-from dotenv import load_dotenv
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
-from redis import asyncio as aioredis
-from fastapi_limiter import FastAPILimiter
+from functools import lru_cache
+from typing import Annotated, Optional
 
-load_dotenv()
+from pydantic import field_validator, model_validator
+from pydantic_settings import BaseSettings, NoDecode, SettingsConfigDict
 
-print(f"DATABASE_URL: {os.getenv('DATABASE_URL')}")
-print(f"SECRET_KEY: {os.getenv('SECRET_KEY')}")
+RATE_LIMIT_DEFAULTS = "login=10/60,signup=5/3600,me=5/60"
 
-SQLALCHEMY_DATABASE_URL = os.getenv("DATABASE_URL")
-REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379")
 
-if SQLALCHEMY_DATABASE_URL is None:
-    print("ERROR: DATABASE_URL is not set.")
-else:
-    print(f"Using database: {SQLALCHEMY_DATABASE_URL}")
+def _parse_rate_limit_specs(value: str) -> dict:
+    return {
+        name.strip(): tuple(int(part) for part in spec.split("/"))
+        for name, spec in (item.split("=") for item in value.split(",") if item.strip())
+    }
 
-engine = create_engine(SQLALCHEMY_DATABASE_URL)
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+class Settings(BaseSettings):
+    """
+    Налаштування застосунку: змінні оточення і .env читаються один раз, при першому імпорті.
+    Імпорт цього модуля не має побічних ефектів - engine, Redis і каталоги створює lifespan у main.py.
+    """
 
-Base = declarative_base()
+    model_config = SettingsConfigDict(env_file=".env", extra="ignore", env_ignore_empty=True)
 
-from app.database import models
+    database_url: Optional[str] = None
+    async_database_url: Optional[str] = None
+    redis_url: str = "redis://localhost:6379"
+    base_url: str = "http://127.0.0.1:8000"
 
-async def init_limiter():
-    redis = await aioredis.from_url(REDIS_URL)
-    await FastAPILimiter.init(redis)
+    # Логи застосунку: json - один об'єкт на рядок разом з полями extra, text - для розробки
+    log_level: str = "INFO"
+    log_format: str = "json"  # json | text
 
-AVATAR_STORAGE_PATH = os.getenv("AVATAR_STORAGE_PATH", "app/static/avatars")
+    # Пул з'єднань: розмір рахується на один воркер uvicorn
+    db_pool_size: int = 5
+    db_max_overflow: int = 10
+    db_pool_timeout: float = 30
+    db_pool_recycle: int = 1800
+    db_pool_pre_ping: bool = True
+    db_statement_timeout: int = 0  # мс, 0 - без обмеження
 
-os.makedirs(AVATAR_STORAGE_PATH, exist_ok=True)
\ No newline at end of file
+    # Репліки для читання: DATABASE_REPLICA_URLS="postgresql://...,postgresql://..." (див. app/database/replicas.py)
+    database_replica_urls: Annotated[tuple[str, ...], NoDecode] = ()
+    db_replica_strategy: str = "least_connections"  # least_connections | round_robin
+    db_replica_check_interval: float = 5
+    db_replica_max_lag: float = 5  # с; репліка з більшим відставанням не отримує запитів
+    # Після запису читання користувача йдуть на primary. Не менше за db_replica_max_lag + db_replica_check_interval:
+    # стільки може відставати репліка, яку ще вважають здоровою
+    db_sticky_seconds: float = 10
+    db_sticky_max_keys: int = 100000
+
+    # JWT: JWT_KEYS="kid:секрет-або-шлях-до-PEM,...", підписує JWT_ACTIVE_KID (див. app/services/tokens.py)
+    secret_key: Optional[str] = None
+    jwt_algorithm: str = "HS256"
+    jwt_keys: str = ""
+    jwt_active_kid: Optional[str] = None
+    token_cache_size: int = 10000
+    token_cache_max_ttl: float = 300
+
+    bcrypt_rounds: int = 12
+    bcrypt_workers: int = os.cpu_count() or 1
+    bcrypt_max_pending: int = 64
+
+    mailgun_api_key: Optional[str] = None
+    mailgun_domain: Optional[str] = None
+    mailgun_sender: Optional[str] = None
+    email_transport: str = "mailgun"
+    email_workers: int = 2
+    email_max_attempts: int = 5
+    email_retry_base_delay: float = 2
+    email_retry_max_delay: float = 600
+
+    # Ліміти запитів: політика=кількість/секунди. Ключ - IP (login, signup) або id користувача (me)
+    # RATE_LIMITS може задати лише частину політик - решта лишається за замовчуванням
+    rate_limits: Annotated[dict[str, tuple[int, int]], NoDecode] = RATE_LIMIT_DEFAULTS
+    # Адреси/мережі балансувальників: лише від них довіряємо X-Forwarded-For (TRUSTED_PROXIES="10.0.0.0/8,127.0.0.1").
+    # Порожньо - IP клієнта береться з TCP-з'єднання (або запускайте uvicorn з --proxy-headers)
+    trusted_proxies: Annotated[tuple[str, ...], NoDecode] = ()
+
+    # /metrics віддає внутрішній стан (пули, репліки, кеш, ліміти), тому за замовчуванням вимкнений.
+    # METRICS_TOKEN - Bearer-токен для Prometheus; METRICS_ALLOWED_IPS - мережі, з яких можна без токена
+    # (звіряється TCP-адреса, не X-Forwarded-For: проксі на тому ж хості не відкриє метрики назовні)
+    metrics_token: Optional[str] = None
+    metrics_allowed_ips: Annotated[tuple[str, ...], NoDecode] = ()
+    rate_limit_fail_open: bool = True
+    rate_limit_sync_interval: float = 0.5
+    rate_limit_max_keys: int = 100000
+
+    # Кеш автентифікованих користувачів (ключ - sub з JWT)
+    user_cache_size: int = 10000
+    user_cache_ttl: float = 10
+    user_cache_redis: bool = False
+    user_cache_redis_ttl: int = 300
+
+    contacts_page_size: int = 50
+    contacts_max_page_size: int = 500
+    contacts_batch_max: int = 1000
+    search_default_limit: int = 20
+    search_max_limit: int = 100
+
+    export_batch_size: int = 1000
+
+    # Delta sync: tombstone-и видалених контактів живуть contacts_tombstone_ttl секунд,
+    # після компактизації клієнтам зі старшим since потрібен повний sync
+    contacts_tombstone_ttl: int = 30 * 24 * 3600
+    contacts_compaction_interval: float = 3600
+    contacts_compaction_batch: int = 5000
+
+    # Потік змін контактів (WebSocket/SSE): журнал останніх подій для відновлення після перепідключення
+    changes_log_size: int = 1000
+    changes_log_ttl: int = 7 * 24 * 3600
+    changes_queue_size: int = 256
+    changes_heartbeat: float = 15
+
+    # Кеш відповідей для списків/пошуку/днів народження: L1 у воркері + Redis
+    response_cache_enabled: bool = True
+    response_cache_ttl: int = 300
+    response_cache_l1_size: int = 5000
+    response_cache_l1_ttl: float = 30
+
+    # Масовий імпорт контактів
+    import_storage_path: str = "app/storage/imports"
+    import_chunk_size: int = 1000  # до ~3500: Postgres приймає до 32767 параметрів на запит
+    import_max_bytes: int = 200 * 1024 * 1024
+    import_max_stored_errors: int = 1000
+    import_stale_seconds: int = 300
+
+    avatar_storage_path: str = "app/static/avatars"
+    avatar_storage: str = "local"  # local | memory
+    avatar_base_url: str = "/static/avatars"
+    avatar_max_bytes: int = 5 * 1024 * 1024
+    avatar_max_pixels: int = 40_000_000
+    avatar_sizes: Annotated[tuple[int, ...], NoDecode] = "64,128,256"
+    avatar_workers: int = 2
+
+    @field_validator("rate_limits", mode="before")
+    @classmethod
+    def _parse_rate_limits(cls, value):
+        if isinstance(value, str):
+            value = _parse_rate_limit_specs(value)
+        return {**_parse_rate_limit_specs(RATE_LIMIT_DEFAULTS), **value}
+
+    @field_validator("trusted_proxies", "metrics_allowed_ips", mode="before")
+    @classmethod
+    def _parse_trusted_proxies(cls, value):
+        if isinstance(value, str):
+            value = [item.strip() for item in value.split(",") if item.strip()]
+        # Помилка в адресі - одразу на старті, а не в кожному запиті
+        return tuple(str(ipaddress.ip_network(item, strict=False)) for item in value)
+
+    @field_validator("avatar_sizes", mode="before")
+    @classmethod
+    def _parse_sizes(cls, value):
+        if isinstance(value, str):
+            return tuple(int(size) for size in value.split(","))
+        return value
+
+    @field_validator("database_replica_urls", mode="before")
+    @classmethod
+    def _parse_replica_urls(cls, value):
+        if isinstance(value, str):
+            value = [url.strip() for url in value.split(",") if url.strip()]
+        return tuple(url.replace("postgresql://", "postgresql+asyncpg://", 1) for url in value)
+
+    @model_validator(mode="after")
+    def _derive_async_url(self):
+        if self.async_database_url is None and self.database_url:
+            self.async_database_url = self.database_url.replace("postgresql://", "postgresql+asyncpg://", 1)
+        return self
+
+    @model_validator(mode="after")
+    def _check_sticky_window(self):
+        # 0 вимикає закріплення свідомо; коротше вікно лише непомітно ламає read-your-writes
+        window = self.db_replica_max_lag + self.db_replica_check_interval
+        if self.database_replica_urls and 0 < self.db_sticky_seconds < window:
+            raise ValueError(f"DB_STICKY_SECONDS must be at least DB_REPLICA_MAX_LAG + DB_REPLICA_CHECK_INTERVAL ({window:g})")
+        return self
+
+
+@lru_cache
+def get_settings() -> Settings:
+    return Settings()
+
+
+settings = get_settings()
+
+_redis = None
+
+def get_redis():
+    # Клієнт створюється ліниво; з'єднання відкриваються лише при першій команді
+    global _redis
+    if _redis is None:
+        from redis import asyncio as aioredis
+
+        _redis = aioredis.from_url(settings.redis_url)
+    return _redis
+
+async def close_redis():
+    global _redis
+    if _redis is not None:
+        await _redis.aclose()
+        _redis = None
@@ -1,75 +1,342 @@
-from sqlalchemy.orm import Session
-from app.database.models import Contact, User
+from collections import defaultdict
+from datetime import datetime, timedelta
+from sqlalchemy import select, update, delete, exists, or_, values, column, cast, any_, bindparam, func, Integer
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import replicas
+from app.database.models import Contact, User, ImportJob
 from app.database.schemas import (
-    ContactCreate, ContactUpdate,
+    ContactCreate, ContactUpdate, ContactBatchUpdate,
     UserCreate, UserResponse
 )
-from app.services.security import hash_password, verify_password as verify_password_service  # Оновлюємо імпорт
-
-def create_user(db: Session, user: UserCreate) -> UserResponse:
-    hashed_password = hash_password(user.password)
-    db_user = User(
-        username=user.username,
-        email=user.email,
-        password_hash=hashed_password
-    )
-    db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
-
-    return UserResponse(
-        id=db_user.id,
-        username=db_user.username,
-        email=db_user.email,
-        is_verified=db_user.is_verified,
-        avatar_url=db_user.avatar_url,
-        created_at=db_user.created_at,
-        updated_at=db_user.updated_at
+from app.services.security import hash_password_async, verify_password_async, password_needs_update
+from app.services import changes, response_cache, user_cache
+from app.services.serialization import contact_dicts
+from app.services.utils import birthday_day_of_year
+
+async def contacts_changed(user_id: int, event_type: str, contacts=None, **payload):
+    # Після запису: закріплюємо читання користувача за primary, скидаємо кеш відповідей
+    # і публікуємо подію в потік змін (created/updated несуть контакти, deleted - id).
+    # Спершу pin: інакше читання між ними пішло б на репліку без цього запису
+    await replicas.pin(user_id)
+    await response_cache.invalidate_user(user_id)
+    if contacts is not None:
+        payload["contacts"] = contact_dicts(contacts)
+    await changes.publish(user_id, event_type, **payload)
+
+async def create_user(db: AsyncSession, user: UserCreate):
+    """Один INSERT ... ON CONFLICT DO NOTHING RETURNING; None, якщо email вже зареєстровано."""
+    # Дешева перевірка за індексом до bcrypt: інакше потік повторних реєстрацій займав би пул хешування.
+    # Гонку між перевіркою і вставкою як і раніше закриває ON CONFLICT.
+    if await db.scalar(select(exists().where(User.email == user.email))):
+        return None
+    hashed_password = await hash_password_async(user.password)
+    stmt = (
+        insert(User)
+        .values(username=user.username, email=user.email, password_hash=hashed_password)
+        .on_conflict_do_nothing(index_elements=[User.email])
+        .returning(User)
     )
+    db_user = await db.scalar(stmt)
+    await db.commit()
+    if db_user is None:
+        return None
+    return UserResponse.model_validate(db_user)
 
-def get_user_by_email(db: Session, email: str):
-    return db.query(User).filter(User.email == email).first()
+async def get_user_by_email(db: AsyncSession, email: str):
+    return await db.scalar(select(User).where(User.email == email))
 
-def get_user_by_id(db: Session, user_id: int):
-    return db.query(User).filter(User.id == user_id).first()
+async def get_contacts_version(db: AsyncSession, user_id: int) -> int:
+    return await db.scalar(select(User.contacts_version).where(User.id == user_id))
 
-def create_contact(db: Session, contact: ContactCreate, user_id: int):
-    db_contact = Contact(
-        **contact.dict(),
-        user_id=user_id
+async def get_user_by_id(db: AsyncSession, user_id: int):
+    return await db.scalar(select(User).where(User.id == user_id))
+
+async def create_contact(db: AsyncSession, contact: ContactCreate, user_id: int):
+    stmt = (
+        insert(Contact)
+        .values(**contact.dict(), birthday_doy=birthday_day_of_year(contact.birthday), user_id=user_id)
+        .returning(Contact)
     )
-    db.add(db_contact)
-    db.commit()
-    db.refresh(db_contact)
+    db_contact = await db.scalar(stmt)
+    await db.commit()
+    await contacts_changed(user_id, "created", [db_contact])
     return db_contact
 
-def get_contacts(db: Session, user_id: int):
-    return db.query(Contact).filter(Contact.user_id == user_id).all()
+def is_email_conflict(e: IntegrityError) -> bool:
+    # Лише unique_violation (23505) на email; NOT NULL, check тощо - не конфлікт, а помилка
+    if getattr(e.orig, "sqlstate", None) != "23505":
+        return False
+    return getattr(e.orig.__cause__, "constraint_name", None) in (None, "uq_contacts_user_email_live")
+
+CONTACT_FIELDS = ("id", "first_name", "last_name", "email", "phone", "birthday", "extra_info", "user_id", "updated_at")
 
-def get_contact_by_id(db: Session, contact_id: int, user_id: int):
-    return db.query(Contact).filter(Contact.id == contact_id, Contact.user_id == user_id).first()
+# Видалені контакти лишаються tombstone-ами для /contacts/sync; усі інші запити їх не бачать
+LIVE = Contact.deleted_at.is_(None)
 
-def update_contact(db: Session, contact_id: int, contact: ContactUpdate, user_id: int):
-    db_contact = db.query(Contact).filter(Contact.id == contact_id, Contact.user_id == user_id).first()
+def _user_locked(user_id: int):
+    """
+    Умова для UPDATE contacts: некорельований EXISTS виконується один раз (InitPlan) до першого рядка
+    і блокує рядок users. Тригер версій теж блокує users, але вже після рядка контакту, тож пачка
+    [A, B] і одночасний PUT B брали б блокування в різному порядку і ловили deadlock (40P01).
+    """
+    return select(User.id).where(User.id == user_id).with_for_update(key_share=True).exists()
+
+async def get_contacts(db: AsyncSession, user_id: int, limit: int, after_id: int = None, fields=None):
+    # Keyset-пагінація по (user_id, id): вартість сторінки не залежить від її глибини
+    columns = [getattr(Contact, name) for name in (fields or CONTACT_FIELDS)]
+    stmt = select(*columns).where(Contact.user_id == user_id, LIVE)
+    if after_id is not None:
+        stmt = stmt.where(Contact.id > after_id)
+    result = await db.execute(stmt.order_by(Contact.id).limit(limit))
+    return result.all()
+
+async def get_contact_by_id(db: AsyncSession, contact_id: int, user_id: int):
+    return await db.scalar(select(Contact).where(Contact.id == contact_id, Contact.user_id == user_id, LIVE))
+
+async def update_contact(db: AsyncSession, contact_id: int, contact: ContactUpdate, user_id: int):
+    # Один UPDATE ... RETURNING замість SELECT + UPDATE + refresh
+    data = contact.dict(exclude_unset=True)
+    if not data:
+        return await get_contact_by_id(db, contact_id, user_id)
+    if "birthday" in data:
+        data["birthday_doy"] = birthday_day_of_year(data["birthday"])
+
+    stmt = (
+        update(Contact)
+        .where(Contact.id == contact_id, Contact.user_id == user_id, LIVE, _user_locked(user_id))
+        .values(**data)
+        .returning(Contact)
+        .execution_options(synchronize_session=False)
+    )
+    db_contact = await db.scalar(stmt)
+    await db.commit()
     if db_contact:
-        for key, value in contact.dict(exclude_unset=True).items():
-            setattr(db_contact, key, value)
-        db.commit()
-        db.refresh(db_contact)
+        await contacts_changed(user_id, "updated", [db_contact])
     return db_contact
 
-def delete_contact(db: Session, contact_id: int, user_id: int):
-    db_contact = db.query(Contact).filter(Contact.id == contact_id, Contact.user_id == user_id).first()
+async def delete_contact(db: AsyncSession, contact_id: int, user_id: int):
+    # М'яке видалення: рядок стає tombstone-ом з новою версією, фізично його прибирає компактизація
+    stmt = (
+        update(Contact)
+        .where(Contact.id == contact_id, Contact.user_id == user_id, LIVE, _user_locked(user_id))
+        .values(deleted_at=func.timezone("utc", func.now()))
+        .returning(Contact)
+        .execution_options(synchronize_session=False)
+    )
+    db_contact = await db.scalar(stmt)
+    await db.commit()
     if db_contact:
-        db.delete(db_contact)
-        db.commit()
+        await contacts_changed(user_id, "deleted", ids=[db_contact.id])
     return db_contact
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return verify_password_service(plain_password, hashed_password)
+def _any_id(ids: list[int]):
+    # id = ANY(:ids) з одним параметром-масивом: текст запиту не залежить від розміру пачки,
+    # тож asyncpg перевикористовує підготовлений statement
+    return Contact.id == any_(bindparam("ids", ids, type_=ARRAY(Integer)))
+
+async def update_contacts_batch(db: AsyncSession, patches: list[ContactBatchUpdate], user_id: int) -> set[int]:
+    """
+    Масове оновлення в одній транзакції. Патчі групуються за набором змінених полів,
+    і кожна група - це один UPDATE ... FROM (VALUES ...) RETURNING id.
+    Повертає id оновлених контактів; решта не існує або належить іншому користувачу.
+    """
+    groups = defaultdict(list)
+    for patch in patches:
+        data = patch.dict(exclude_unset=True, exclude={"id"})
+        if "birthday" in data:
+            data["birthday_doy"] = birthday_day_of_year(data["birthday"])
+        groups[tuple(sorted(data))].append({"id": patch.id, **data})
+
+    updated, changed = set(), []
+    for names, rows in groups.items():
+        ids = [row["id"] for row in rows]
+        if not names:
+            # Порожній патч нічого не змінює, лише перевіряємо, що контакт існує
+            updated.update(await db.scalars(
+                select(Contact.id).where(Contact.user_id == user_id, LIVE, _any_id(ids))
+            ))
+            continue
+
+        types = {name: Contact.__table__.c[name].type for name in names}
+        patch_values = values(
+            column("id", Contact.id.type),
+            *[column(name, types[name]) for name in names],
+            name="patch",
+        ).data([tuple(row[name] for name in ("id",) + names) for row in rows])
+        stmt = (
+            update(Contact)
+            .where(Contact.user_id == user_id, LIVE, Contact.id == patch_values.c.id, _user_locked(user_id))
+            # CAST: стовпець VALUES лише з NULL Postgres інакше вважає text
+            .values({name: cast(patch_values.c[name], types[name]) for name in names})
+            .returning(Contact)
+            .execution_options(synchronize_session=False)
+        )
+        contacts = (await db.scalars(stmt)).all()
+        changed.extend(contacts)
+        updated.update(contact.id for contact in contacts)
+
+    await db.commit()
+    if changed:
+        await contacts_changed(user_id, "updated", changed)
+    return updated
 
-def update_avatar(db: Session, user: User, avatar_path: str):
-    user.avatar_url = avatar_path
-    db.commit()
-    db.refresh(user)
+async def delete_contacts_batch(db: AsyncSession, ids: list[int], user_id: int) -> set[int]:
+    stmt = (
+        update(Contact)
+        .where(Contact.user_id == user_id, LIVE, _any_id(ids), _user_locked(user_id))
+        .values(deleted_at=func.timezone("utc", func.now()))
+        .returning(Contact.id)
+        .execution_options(synchronize_session=False)
+    )
+    deleted = set(await db.scalars(stmt))
+    await db.commit()
+    if deleted:
+        await contacts_changed(user_id, "deleted", ids=sorted(deleted))
+    return deleted
+
+async def verify_password(plain_password: str, hashed_password: str) -> bool:
+    return await verify_password_async(plain_password, hashed_password)
+
+async def authenticate_user(db: AsyncSession, email: str, password: str):
+    user = await get_user_by_email(db, email)
+    if not user or not await verify_password(password, user.password_hash):
+        return None
+
+    # Хеш зі старою кількістю раундів bcrypt переписуємо після успішного входу
+    if password_needs_update(user.password_hash):
+        user.password_hash = await hash_password_async(password)
+        await db.commit()
     return user
+
+async def update_avatar(db: AsyncSession, user_id: int, avatar_path: str):
+    stmt = (
+        update(User)
+        .where(User.id == user_id)
+        .values(avatar_url=avatar_path)
+        .returning(User)
+        .execution_options(synchronize_session=False)
+    )
+    user = await db.scalar(stmt)
+    await db.commit()
+    await user_cache.invalidate(user.email)
+    return user
+
+async def verify_email(db: AsyncSession, email: str):
+    """Підтверджує email одним UPDATE; None - користувача немає або він вже підтверджений."""
+    stmt = (
+        update(User)
+        .where(User.email == email, User.is_verified.is_not(True))
+        .values(is_verified=True)
+        .returning(User)
+        .execution_options(synchronize_session=False)
+    )
+    user = await db.scalar(stmt)
+    await db.commit()
+    if user:
+        await user_cache.invalidate(user.email)
+    return user
+
+async def insert_contacts_bulk(db: AsyncSession, contacts: list[ContactCreate], user_id: int) -> set[str]:
+    # Один multi-row INSERT; існуючі (user_id, email) пропускаються. Commit робить викликач.
+    if not contacts:
+        return set()
+    rows = [
+        {**contact.dict(), "birthday_doy": birthday_day_of_year(contact.birthday), "user_id": user_id}
+        for contact in contacts
+    ]
+    # Рядок users - до вставки: ON CONFLICT може чекати на чужий незакомічений контакт,
+    # і тоді порядок блокувань має бути той самий, що в інших записах (див. _user_locked)
+    await db.execute(select(User.id).where(User.id == user_id).with_for_update(key_share=True))
+    stmt = (
+        insert(Contact)
+        .values(rows)
+        .on_conflict_do_nothing(index_elements=[Contact.user_id, Contact.email], index_where=LIVE)
+        .returning(Contact.email)
+    )
+    return set((await db.scalars(stmt)).all())
+
+async def get_sync_state(db: AsyncSession, user_id: int):
+    return (await db.execute(
+        select(User.contacts_version, User.contacts_purged_version).where(User.id == user_id)
+    )).one()
+
+async def get_contact_changes(db: AsyncSession, user_id: int, since: int, limit: int):
+    """
+    Зміни після версії since у порядку версій, разом з tombstone-ами. Версії в межах користувача
+    унікальні, тож сторінки ріжуться просто за версією. З since=0 - лише живі контакти.
+    """
+    columns = [getattr(Contact, name) for name in CONTACT_FIELDS]
+    stmt = select(*columns, Contact.version, Contact.deleted_at).where(Contact.user_id == user_id, Contact.version > since)
+    if not since:
+        stmt = stmt.where(LIVE)
+    result = await db.execute(stmt.order_by(Contact.version).limit(limit))
+    return result.all()
+
+async def purge_tombstones(db: AsyncSession, older_than: datetime, batch_size: int) -> int:
+    """
+    Фізично видаляє до batch_size tombstone-ів, старших за older_than, і запам'ятовує в users
+    найбільшу видалену версію: клієнтам, що синхронізувались раніше, потрібен повний sync.
+    """
+    doomed = (
+        select(Contact.id)
+        .where(Contact.deleted_at < older_than)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+        .scalar_subquery()
+    )
+    purged = (
+        delete(Contact)
+        .where(Contact.id.in_(doomed))
+        .returning(Contact.user_id, Contact.version)
+        .cte("purged")
+    )
+    per_user = (
+        select(purged.c.user_id, func.max(purged.c.version).label("version"), func.count().label("total"))
+        .group_by(purged.c.user_id)
+        .subquery()
+    )
+    stmt = (
+        update(User)
+        .where(User.id == per_user.c.user_id)
+        # updated_at=updated_at: службове оновлення не має підміняти час зміни профілю
+        .values(
+            contacts_purged_version=func.greatest(User.contacts_purged_version, per_user.c.version),
+            updated_at=User.updated_at,
+        )
+        .returning(per_user.c.total)
+        .execution_options(synchronize_session=False)
+    )
+    purged_count = sum((await db.scalars(stmt)).all())
+    await db.commit()
+    return purged_count
+
+async def create_import_job(db: AsyncSession, user_id: int, format: str, file_path: str):
+    stmt = (
+        insert(ImportJob)
+        .values(user_id=user_id, format=format, file_path=file_path, status="pending", errors=[])
+        .returning(ImportJob)
+    )
+    job = await db.scalar(stmt)
+    await db.commit()
+    return job
+
+async def get_import_job(db: AsyncSession, job_id: int, user_id: int):
+    return await db.scalar(select(ImportJob).where(ImportJob.id == job_id, ImportJob.user_id == user_id))
+
+async def claim_stale_import_jobs(db: AsyncSession, stale_after: timedelta):
+    # Незавершені задачі, які давно не оновлювались (воркер упав або перезапустився)
+    stmt = (
+        update(ImportJob)
+        .where(
+            ImportJob.status.in_(["pending", "running"]),
+            or_(ImportJob.updated_at.is_(None), ImportJob.updated_at < datetime.utcnow() - stale_after),
+        )
+        .values(status="running", updated_at=datetime.utcnow())
+        .returning(ImportJob.id)
+    )
+    job_ids = (await db.scalars(stmt)).all()
+    await db.commit()
+    return job_ids
@@ -1,11 +1,57 @@
-from sqlalchemy.orm import sessionmaker
-from app.config import engine
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+from app.config import settings
+from app.database.pool_metrics import instrumented_pool, track_connections
+from app.database.query_counter import track_queries
+from app.services.instrumentation import track_query_timing
 
-def get_db():
-    db = SessionLocal()
-    try:
+
+def create_db_engine(url: str):
+    connect_args = {}
+    if settings.db_statement_timeout:
+        connect_args["server_settings"] = {"statement_timeout": str(settings.db_statement_timeout)}
+
+    db_engine = create_async_engine(
+        url,
+        poolclass=instrumented_pool(AsyncAdaptedQueuePool),
+        pool_size=settings.db_pool_size,
+        max_overflow=settings.db_max_overflow,
+        pool_timeout=settings.db_pool_timeout,
+        pool_recycle=settings.db_pool_recycle,
+        pool_pre_ping=settings.db_pool_pre_ping,
+        connect_args=connect_args,
+    )
+    track_connections(db_engine.sync_engine)
+    track_queries(db_engine.sync_engine)
+    track_query_timing(db_engine.sync_engine)
+    return db_engine
+
+
+engine = None
+
+# expire_on_commit=False: атрибути лишаються завантаженими після commit, async-сесія не вміє lazy-load.
+# Engine прив'язується в init_engine() (lifespan застосунку або скрипт), а не під час імпорту.
+SessionLocal = async_sessionmaker(class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
+
+def init_engine():
+    global engine
+    if engine is None:
+        if not settings.async_database_url:
+            raise RuntimeError("DATABASE_URL is not set")
+        engine = create_db_engine(settings.async_database_url)
+        SessionLocal.configure(bind=engine)
+    return engine
+
+
+async def dispose_engine():
+    global engine
+    if engine is not None:
+        await engine.dispose()
+        engine = None
+
+
+async def get_db():
+    async with SessionLocal() as db:
         yield db
-    finally:
-        db.close()
\ No newline at end of file
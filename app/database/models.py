@@ -1,7 +1,9 @@
-from sqlalchemy import Column, Integer, String, Date, Boolean, DateTime, ForeignKey
-from sqlalchemy.orm import relationship
+from sqlalchemy import BigInteger, Column, Integer, SmallInteger, String, Text, Date, Boolean, DateTime, ForeignKey, Computed, Index, JSON, text
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlalchemy.orm import declarative_base, relationship, deferred
 from datetime import datetime
-from app.config import Base
+
+Base = declarative_base()
 
 
 class User(Base):
@@ -16,20 +18,72 @@ class User(Base):
     avatar_url = Column(String, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    # Змінюється тригером на contacts (див. міграції e57b19d0a6c3, 3f9c2d7a1b64), застосунок його лише читає.
+    # Це і версія для ETag, і high-water mark для /contacts/sync.
+    contacts_version = Column(BigInteger, nullable=False, default=0, server_default="0")
+    # Найбільша версія серед видалених при компактизації tombstone-ів: sync з меншої версії вже неповний
+    contacts_purged_version = Column(BigInteger, nullable=False, default=0, server_default="0")
 
     contacts = relationship("Contact", back_populates="user")
 
 
+SEARCH_DOCUMENT = (
+    "coalesce(first_name, '') || ' ' || coalesce(last_name, '') || ' ' || coalesce(email, '') "
+    "|| ' ' || coalesce(phone, '') || ' ' || coalesce(extra_info, '')"
+)
+
+
 class Contact(Base):
     __tablename__ = "contacts"
 
     id = Column(Integer, primary_key=True, index=True)
     first_name = Column(String, nullable=False)
     last_name = Column(String, nullable=False)
-    email = Column(String, unique=True, nullable=False)
+    email = Column(String, nullable=False)
     phone = Column(String, nullable=False)
     birthday = Column(Date, nullable=True)
+    birthday_doy = Column(SmallInteger, nullable=True)  # день року у високосному році, 29 лютого = 60
     extra_info = Column(String, nullable=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    # Номер зміни з contacts_version_seq (спільна на всі контакти); ставить тригер на кожен INSERT/UPDATE.
+    # У межах користувача версії зростають у порядку commit-ів, але йдуть з пропусками
+    version = Column(BigInteger, nullable=False, server_default="0")
+    # Tombstone: видалений контакт лишається, доки sync-клієнти не дізнаються про видалення
+    deleted_at = Column(DateTime, nullable=True)
+
+    # Підтримуються Postgres (GENERATED ... STORED), у SELECT не завантажуються
+    search_vector = deferred(Column(TSVECTOR, Computed(f"to_tsvector('simple'::regconfig, {SEARCH_DOCUMENT})", persisted=True)))
+    search_text = deferred(Column(Text, Computed(f"lower({SEARCH_DOCUMENT})", persisted=True)))
+
+    user = relationship("User", back_populates="contacts")
 
-    user = relationship("User", back_populates="contacts")
\ No newline at end of file
+    __table_args__ = (
+        Index("ix_contacts_user_id_id", "user_id", "id"),
+        Index("ix_contacts_user_last_first", "user_id", "last_name", "first_name"),
+        Index("uq_contacts_user_email_live", "user_id", "email", unique=True, postgresql_where=text("deleted_at IS NULL")),
+        Index("uq_contacts_user_version", "user_id", "version", unique=True),
+        Index("ix_contacts_deleted_at", "deleted_at", postgresql_where=text("deleted_at IS NOT NULL")),
+        Index("ix_contacts_user_birthday_doy", "user_id", "birthday_doy"),
+        Index("ix_contacts_user_search_vector", "user_id", "search_vector", postgresql_using="gin"),
+        Index(
+            "ix_contacts_user_search_text", "user_id", "search_text",
+            postgresql_using="gin", postgresql_ops={"search_text": "gin_trgm_ops"},
+        ),
+    )
+
+
+class ImportJob(Base):
+    __tablename__ = "import_jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    format = Column(String, nullable=False)
+    status = Column(String, nullable=False, default="pending")
+    file_path = Column(String, nullable=False)
+    processed_rows = Column(Integer, nullable=False, default=0)
+    inserted_rows = Column(Integer, nullable=False, default=0)
+    error_count = Column(Integer, nullable=False, default=0)
+    errors = Column(JSON, nullable=False, default=list)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -0,0 +1,92 @@
+import time
+from bisect import bisect_left
+
+from sqlalchemy import event, exc
+
+WAIT_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+AGE_BUCKETS = (60, 300, 900, 1800, 3600, 7200)
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def snapshot(self):
+        cumulative, total = {}, 0
+        for bound, count in zip(list(self.buckets) + ["+Inf"], self.counts):
+            total += count
+            cumulative[str(bound)] = total
+        return {"buckets": cumulative, "count": self.count, "sum": round(self.sum, 6)}
+
+
+class PoolStats:
+    def __init__(self):
+        self.wait_time = Histogram(WAIT_BUCKETS)
+        self.checkout_age = Histogram(AGE_BUCKETS)
+        self.timeouts = 0
+        self.connected_at = {}
+
+
+def instrumented_pool(pool_class):
+    """Підклас пулу, що міряє час очікування з'єднання. Pool.recreate() зберігає клас, а отже і статистику."""
+    stats = PoolStats()
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return pool_class._do_get(self)
+        except exc.TimeoutError:
+            stats.timeouts += 1
+            raise
+        finally:
+            stats.wait_time.observe(time.perf_counter() - start)
+
+    return type(f"Instrumented{pool_class.__name__}", (pool_class,), {"stats": stats, "_do_get": _do_get})
+
+
+def track_connections(engine):
+    stats = engine.pool.stats
+
+    @event.listens_for(engine, "connect")
+    def on_connect(dbapi_connection, connection_record):
+        stats.connected_at[id(connection_record)] = time.monotonic()
+
+    @event.listens_for(engine, "checkout")
+    def on_checkout(dbapi_connection, connection_record, connection_proxy):
+        connected_at = stats.connected_at.get(id(connection_record))
+        if connected_at is not None:
+            stats.checkout_age.observe(time.monotonic() - connected_at)
+
+    @event.listens_for(engine, "close")
+    def on_close(dbapi_connection, connection_record):
+        stats.connected_at.pop(id(connection_record), None)
+
+    @event.listens_for(engine, "detach")
+    def on_detach(dbapi_connection, connection_record):
+        stats.connected_at.pop(id(connection_record), None)
+
+
+def pool_snapshot(engine):
+    pool = engine.pool
+    stats = pool.stats
+    now = time.monotonic()
+    ages = [now - connected_at for connected_at in stats.connected_at.values()]
+    return {
+        "size": pool.size(),
+        "checked_in": pool.checkedin(),
+        "checked_out": pool.checkedout(),
+        "overflow": max(pool.overflow(), 0),
+        "timeouts": stats.timeouts,
+        "wait_seconds": stats.wait_time.snapshot(),
+        "checkout_age_seconds": stats.checkout_age.snapshot(),
+        "open_connections": len(ages),
+        "oldest_connection_age_seconds": round(max(ages), 3) if ages else 0,
+    }
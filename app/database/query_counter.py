@@ -0,0 +1,34 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from sqlalchemy import event
+
+# Список виконаних statement-ів поточного контексту (запиту/задачі); None - підрахунок вимкнено
+_statements: ContextVar = ContextVar("db_statements", default=None)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    statements = _statements.get()
+    if statements is not None:
+        statements.append(statement)
+
+
+def track_queries(sync_engine):
+    event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+
+
+@contextmanager
+def count_queries():
+    """
+    Збирає SQL, виконаний у поточному контексті:
+        with count_queries() as statements:
+            ...
+        len(statements)
+    Async-сесія виконує запити в greenlet з тим самим contextvars-контекстом, тож лічильник бачить їх.
+    """
+    statements = []
+    token = _statements.set(statements)
+    try:
+        yield statements
+    finally:
+        _statements.reset(token)
@@ -0,0 +1,153 @@
+import asyncio
+import itertools
+import logging
+from contextlib import asynccontextmanager
+
+from sqlalchemy import text
+
+from app.config import get_redis, settings
+from app.database import db
+from app.database.pool_metrics import pool_snapshot
+from app.services.cache import LRUCache
+
+logger = logging.getLogger(__name__)
+
+# Відставання репліки в секундах. Якщо вся отримана WAL вже застосована, репліка актуальна, навіть коли
+# останній застосований запис старий. На primary обидві функції повертають NULL - лаг нульовий.
+LAG_QUERY = text("""
+    SELECT CASE
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+""")
+
+stats = {"primary": 0, "replica": 0, "pinned": 0}
+
+
+class Replica:
+    def __init__(self, url: str):
+        self.engine = db.create_db_engine(url)
+        self.name = f"{self.engine.url.host}:{self.engine.url.port or 5432}/{self.engine.url.database}"
+        # None - ще не перевірялася; до першої перевірки запити йдуть на primary
+        self.healthy = None
+        self.lag = None
+        self.error = None
+
+    def snapshot(self):
+        return {**pool_snapshot(self.engine.sync_engine), "healthy": self.healthy, "lag": self.lag, "error": self.error}
+
+
+_replicas: list[Replica] = []
+_round_robin = itertools.count()
+_checker = None
+
+# Користувачі, які нещодавно писали: їхні читання йдуть на primary (read-your-writes)
+_pins = LRUCache(settings.db_sticky_max_keys, settings.db_sticky_seconds)
+
+
+def _pin_key(user_id: int) -> str:
+    return f"db:pinned:{user_id}"
+
+
+async def pin(user_id: int):
+    """Після запису користувач db_sticky_seconds читає з primary, доки репліки не наздоженуть."""
+    if not _replicas or settings.db_sticky_seconds <= 0:
+        return
+    _pins.set(user_id, True)
+    try:
+        # Через Redis закріплення бачать і інші воркери
+        await get_redis().set(_pin_key(user_id), 1, px=int(settings.db_sticky_seconds * 1000))
+    except Exception as e:
+        logger.warning("Replica pin: Redis unavailable: %s", e)
+
+
+async def _is_pinned(user_id: int) -> bool:
+    if _pins.get(user_id):
+        return True
+    try:
+        return bool(await get_redis().exists(_pin_key(user_id)))
+    except Exception as e:
+        # Без Redis невідомо, чи писав користувач через інший воркер - безпечніше читати з primary
+        logger.warning("Replica pin: Redis unavailable: %s", e)
+        return True
+
+
+def _choose():
+    healthy = [replica for replica in _replicas if replica.healthy]
+    if not healthy:
+        return None
+    start = next(_round_robin) % len(healthy)
+    if settings.db_replica_strategy == "round_robin":
+        return healthy[start]
+    # Найменше з'єднань, взятих із пулу цього воркера; при рівності - по колу, а не завжди перша
+    rotated = healthy[start:] + healthy[:start]
+    return min(rotated, key=lambda replica: replica.engine.pool.checkedout())
+
+
+@asynccontextmanager
+async def read_session(user_id: int):
+    """Сесія лише для читання: здорова репліка або primary, якщо реплік немає чи користувач закріплений."""
+    replica, target = None, "primary"
+    if _replicas:
+        if await _is_pinned(user_id):
+            target = "pinned"
+        else:
+            replica = _choose()
+            target = "replica" if replica else "primary"
+    stats[target] += 1
+
+    async with db.SessionLocal(bind=replica.engine if replica else db.engine) as session:
+        # Відповіді з репліки не кладуться в кеш відповідей: вона може ще не мати останнього запису
+        session.info["replica"] = replica is not None
+        yield session
+
+
+async def _check(replica: Replica):
+    async def query_lag():
+        async with replica.engine.connect() as conn:
+            return await conn.scalar(LAG_QUERY)
+
+    try:
+        lag = await asyncio.wait_for(query_lag(), timeout=settings.db_replica_check_interval)
+    except Exception as e:
+        healthy, replica.lag, replica.error = False, None, str(e) or type(e).__name__
+    else:
+        replica.lag, replica.error = float(lag), None
+        healthy = replica.lag <= settings.db_replica_max_lag
+
+    if healthy != replica.healthy:
+        logger.warning(
+            "Replica %s is %s", replica.name, "healthy" if healthy else "unhealthy",
+            extra={"lag": replica.lag, "error": replica.error},
+        )
+    replica.healthy = healthy
+
+
+async def _check_loop():
+    while True:
+        await asyncio.sleep(settings.db_replica_check_interval)
+        await asyncio.gather(*[_check(replica) for replica in _replicas])
+
+
+async def start():
+    global _checker
+    if _replicas or not settings.database_replica_urls:
+        return
+    _replicas.extend(Replica(url) for url in settings.database_replica_urls)
+    await asyncio.gather(*[_check(replica) for replica in _replicas])
+    _checker = asyncio.create_task(_check_loop())
+
+
+async def stop():
+    global _checker
+    if _checker is not None:
+        _checker.cancel()
+        await asyncio.gather(_checker, return_exceptions=True)
+        _checker = None
+    for replica in _replicas:
+        await replica.engine.dispose()
+    _replicas.clear()
+
+
+def snapshot():
+    return {replica.name: replica.snapshot() for replica in _replicas}
@@ -1,4 +1,4 @@
-from pydantic import BaseModel, EmailStr
+from pydantic import BaseModel, EmailStr, field_validator
 from typing import Optional
 from datetime import datetime, date
 
@@ -46,9 +46,71 @@ class ContactUpdate(BaseModel):
     birthday: Optional[date] = None
     extra_info: Optional[str] = None
 
+    # Поле можна не передавати, але не можна стерти: у БД ці колонки NOT NULL
+    @field_validator("first_name", "last_name", "email", "phone", mode="before")
+    @classmethod
+    def _not_null(cls, value):
+        if value is None:
+            raise ValueError("Field cannot be null")
+        return value
+
+class ContactBatchUpdate(ContactUpdate):
+    id: int
+
+class ContactBatchDelete(BaseModel):
+    ids: list[int]
+
+class BatchItemResult(BaseModel):
+    id: int
+    status: str  # updated | deleted | not_found
+
+class BatchResult(BaseModel):
+    results: list[BatchItemResult]
+
 class ContactResponse(ContactCreate):
     id: int
     user_id: int
+    updated_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+class ContactPartial(BaseModel):
+    id: int
+    first_name: Optional[str] = None
+    last_name: Optional[str] = None
+    email: Optional[EmailStr] = None
+    phone: Optional[str] = None
+    birthday: Optional[date] = None
+    extra_info: Optional[str] = None
+    user_id: Optional[int] = None
+    updated_at: Optional[datetime] = None
+
+class ContactPage(BaseModel):
+    items: list[ContactPartial]
+    next_cursor: Optional[str] = None
+
+class ContactSyncPage(BaseModel):
+    items: list[ContactResponse]
+    deleted: list[int]
+    version: int  # since для наступного запиту
+    has_more: bool
+    reset: bool = False  # клієнт очищає локальні дані, items - повний набір; сторінки далі з full=true
+
+class ImportRowError(BaseModel):
+    row: int
+    error: str
+
+class ImportJobResponse(BaseModel):
+    id: int
+    format: str
+    status: str
+    processed_rows: int
+    inserted_rows: int
+    error_count: int
+    errors: list[ImportRowError]
+    created_at: datetime
+    updated_at: datetime
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
@@ -0,0 +1,57 @@
+import logging
+import logging.config
+from datetime import datetime, timezone
+
+import orjson
+
+from app.config import settings
+
+# Атрибути, які має кожен LogRecord; решта прийшла через extra= і виводиться окремими полями
+_RECORD_ATTRS = set(vars(logging.makeLogRecord({}))) | {"message", "asctime", "taskName"}
+
+
+def _extra(record: logging.LogRecord) -> dict:
+    return {key: value for key, value in vars(record).items() if key not in _RECORD_ATTRS}
+
+
+class JsonFormatter(logging.Formatter):
+    """Один JSON-об'єкт на рядок: час, рівень, логер, повідомлення і всі поля з extra."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            **_extra(record),
+        }
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return orjson.dumps(entry, default=str).decode()
+
+
+class TextFormatter(logging.Formatter):
+    """Звичайний текстовий формат для розробки; поля з extra дописуються як key=value."""
+
+    def formatMessage(self, record: logging.LogRecord) -> str:
+        message = super().formatMessage(record)
+        extra = _extra(record)
+        if extra:
+            message += " " + " ".join(f"{key}={value!r}" for key, value in extra.items())
+        return message
+
+
+def configure_logging():
+    # Логери uvicorn налаштовує сам (propagate=False), тут лише кореневий - для логерів застосунку
+    formatter = (
+        {"()": JsonFormatter}
+        if settings.log_format == "json"
+        else {"()": TextFormatter, "format": "%(asctime)s %(levelname)s %(name)s: %(message)s"}
+    )
+    logging.config.dictConfig({
+        "version": 1,
+        "disable_existing_loggers": False,
+        "formatters": {"default": formatter},
+        "handlers": {"default": {"class": "logging.StreamHandler", "formatter": "default"}},
+        "root": {"level": settings.log_level.upper(), "handlers": ["default"]},
+    })
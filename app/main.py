@@ -1,20 +1,50 @@
-import sys
 import os
-import asyncio
-
-sys.path.append(os.path.abspath(os.path.dirname(__file__)))
+from contextlib import asynccontextmanager
 
 from fastapi import FastAPI, Depends
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.security import OAuth2PasswordBearer
-from fastapi_limiter.depends import RateLimiter
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, ORJSONResponse
+
+from app.config import close_redis, settings
+from app.database import replicas
+from app.database.db import dispose_engine, init_engine
+from app.logging_config import configure_logging
+from app.middleware import BodySizeLimitMiddleware, TimingMiddleware
+from app.services import avatars, changes, rate_limit, tokens, tombstones
+from app.services.security import shutdown_executor
+from app.services.imports import resume_imports
+from app.services.email import start_email_workers, stop_email_workers
+from app.routes import changes as changes_routes, contacts, users, auth, metrics
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Усе, що відкриває з'єднання чи створює файли, відбувається тут, а не під час імпорту модулів
+    configure_logging()
+    tokens.load_keys()
+    init_engine()
+    await replicas.start()
+    os.makedirs(settings.avatar_storage_path, exist_ok=True)
+    os.makedirs(settings.import_storage_path, exist_ok=True)
+    await rate_limit.start()
+    await resume_imports()
+    await tombstones.start()
+    await start_email_workers()
+    yield
+    await stop_email_workers()
+    await changes.stop()
+    await tombstones.stop()
+    await rate_limit.stop()
+    shutdown_executor()
+    avatars.shutdown_executor()
+    await replicas.stop()
+    await dispose_engine()
+    await close_redis()
 
-from app.config import init_limiter  
-from app.routes import contacts, users, auth  
 
-app = FastAPI(title="Contacts API with Authentication")
+app = FastAPI(title="Contacts API with Authentication", default_response_class=ORJSONResponse, lifespan=lifespan)
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 
@@ -26,10 +56,21 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Запас на multipart-заголовки поверх ліміту самого файлу
+app.add_middleware(BodySizeLimitMiddleware, limits={"/auth/avatar": settings.avatar_max_bytes + 64 * 1024})
+
+# Додана останньою - зовнішня, тож міряє і роботу інших middleware
+app.add_middleware(TimingMiddleware)
+
+# До contacts.router: інакше /contacts/changes перехопить маршрут /contacts/{contact_id}
+app.include_router(changes_routes.router)
 app.include_router(contacts.router)
 app.include_router(users.router)
 app.include_router(auth.router)
+app.include_router(metrics.router)
 
+if settings.avatar_base_url.startswith("/"):
+    app.mount(settings.avatar_base_url, avatars.ImmutableStaticFiles(directory=settings.avatar_storage_path, check_dir=False), name="avatars")
 app.mount("/static", StaticFiles(directory="app/static"), name="static")
 
 @app.get("/")
@@ -40,10 +81,10 @@ def root():
 def secure_endpoint(token: str = Depends(oauth2_scheme)):
     return {"message": "Token is valid"}
 
+@app.get("/.well-known/jwks.json", include_in_schema=False)
+def jwks():
+    return tokens.jwks()
+
 @app.get("/favicon.ico", include_in_schema=False)
 async def favicon():
     return FileResponse("app/static/favicon.svg")
-
-@app.on_event("startup")
-async def startup():
-    await init_limiter()
\ No newline at end of file
@@ -0,0 +1,80 @@
+import time
+
+from fastapi import HTTPException, status
+from fastapi.responses import JSONResponse
+
+from app.services.instrumentation import (
+    http_requests, http_latency, db_queries_per_request, request_timings, server_timing,
+)
+
+
+class BodySizeLimitMiddleware:
+    """
+    Обмежує розмір тіла запиту для окремих шляхів ще під час читання потоку,
+    до того як FastAPI розбере multipart у тимчасовий файл.
+    """
+
+    def __init__(self, app, limits: dict[str, int]):
+        self.app = app
+        self.limits = limits
+
+    async def __call__(self, scope, receive, send):
+        limit = self.limits.get(scope["path"]) if scope["type"] == "http" else None
+        if limit is None:
+            await self.app(scope, receive, send)
+            return
+
+        content_length = dict(scope["headers"]).get(b"content-length")
+        if content_length and content_length.isdigit() and int(content_length) > limit:
+            response = JSONResponse({"detail": "Request body is too large"}, status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+            await response(scope, receive, send)
+            return
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail="Request body is too large")
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+
+class TimingMiddleware:
+    """
+    Міряє кожен HTTP-запит: гістограма латентності за шаблоном маршруту (/contacts/{contact_id},
+    а не конкретний id) і заголовок Server-Timing з часом застосунку, БД, bcrypt, JWT тощо.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status_code = 500
+
+        with request_timings() as timings:
+            async def timed_send(message):
+                nonlocal status_code
+                if message["type"] == "http.response.start":
+                    status_code = message["status"]
+                    header = server_timing(timings, time.perf_counter() - start)
+                    message["headers"] = list(message.get("headers", [])) + [(b"server-timing", header.encode())]
+                await send(message)
+
+            try:
+                await self.app(scope, receive, timed_send)
+            finally:
+                route = scope.get("route")
+                template = getattr(route, "path", None) or "unmatched"
+                http_latency.labels(scope["method"], template).observe(time.perf_counter() - start)
+                http_requests.labels(scope["method"], template, status_code).inc()
+                db_queries_per_request.labels(template).observe(timings.get("db", (0, 0))[0])
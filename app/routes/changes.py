@@ -0,0 +1,95 @@
+import logging
+from contextlib import suppress
+from typing import Optional
+
+import anyio
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, WebSocket, WebSocketException, status
+from fastapi.responses import StreamingResponse
+from starlette.requests import HTTPConnection
+
+from app.database import schemas
+from app.database.db import SessionLocal
+from app.services import changes
+from app.services.auth import user_from_token
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/contacts", tags=["Contacts"])
+
+
+async def _stream_user(connection: HTTPConnection, access_token: Optional[str] = Query(None)):
+    # EventSource і WebSocket у браузері не вміють надіслати Authorization, тому токен можна передати в query.
+    # Сесія коротка: потік живе годинами, і з'єднання з пулу не має триматися весь цей час.
+    scheme, _, token = connection.headers.get("authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        token = access_token
+    try:
+        if not token:
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Not authenticated")
+        async with SessionLocal() as db:
+            return await user_from_token(token, db)
+    except HTTPException:
+        if connection.scope["type"] == "websocket":
+            raise WebSocketException(code=status.WS_1008_POLICY_VIOLATION)
+        raise
+
+
+async def _sse(user_id: int, since: Optional[int]):
+    yield b"retry: 3000\n\n"
+    try:
+        async for event in changes.stream(user_id, since):
+            if event is None:
+                yield b": ping\n\n"
+                continue
+            seq, _, message = event
+            # id стає Last-Event-ID, з яким EventSource сам перепідключається
+            yield b"id: %d\ndata: %s\n\n" % (seq, message)
+    except Exception:
+        # Заголовки вже надіслані - просто завершуємо потік, клієнт перепідключиться
+        logger.warning("Change feed stream failed", exc_info=True, extra={"user_id": user_id})
+
+
+@router.get("/changes", response_class=StreamingResponse)
+async def contact_changes(
+    since: Optional[int] = Query(None, ge=0, description="Last seq the client has processed"),
+    last_event_id: Optional[int] = Header(None, ge=0),
+    current_user: schemas.UserResponse = Depends(_stream_user),
+):
+    """Server-Sent Events: created/updated/deleted/imported/reset, кожна подія з seq."""
+    resume = last_event_id if last_event_id is not None else since
+    return StreamingResponse(
+        _sse(current_user.id, resume),
+        media_type="text/event-stream",
+        # X-Accel-Buffering: nginx інакше буферизує відповідь і події приходять пачками
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.websocket("/changes/ws")
+async def contact_changes_ws(
+    websocket: WebSocket,
+    since: Optional[int] = Query(None, ge=0),
+    current_user: schemas.UserResponse = Depends(_stream_user),
+):
+    await websocket.accept()
+
+    async with anyio.create_task_group() as tg:
+        async def receive():
+            # Клієнт нічого не надсилає; читаємо лише щоб помітити закриття з'єднання
+            while (await websocket.receive())["type"] != "websocket.disconnect":
+                pass
+            tg.cancel_scope.cancel()
+
+        tg.start_soon(receive)
+        try:
+            async for event in changes.stream(current_user.id, since):
+                # Keep-alive на WebSocket робить сам uvicorn (ping-фрейми)
+                if event is not None:
+                    await websocket.send_text(event[2].decode())
+        except Exception:
+            # Потік обірвався з нашого боку (Redis недоступний) - клієнт перепідключається з since
+            logger.warning("Change feed stream failed", exc_info=True, extra={"user_id": current_user.id})
+            with suppress(Exception):
+                await websocket.close(code=status.WS_1011_INTERNAL_ERROR)
+            tg.cancel_scope.cancel()
@@ -1,65 +1,231 @@
+from contextlib import asynccontextmanager
 from datetime import date
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.database import crud, schemas
-from app.config import SessionLocal
+from app.database.db import SessionLocal, get_db
+from app.config import settings
+from app.services.pagination import encode_cursor, decode_cursor
 from app.services.utils import search_contacts, get_upcoming_birthdays
-from app.services.auth import get_current_user
+from app.services.auth import get_current_user, get_read_db
+from app.services import export
+from app.services.serialization import dump_changes, dump_contacts, dump_rows
+from app.services.http_cache import make_etag, etag_matches, not_modified, apply_cache_headers, cached_response
+from app.services.imports import FORMATS as IMPORT_FORMATS, spool_upload, start_import
 
 router = APIRouter(prefix="/contacts", tags=["Contacts"])
 
-def get_db():
-    db = SessionLocal()
+@asynccontextmanager
+async def _email_conflict(db: AsyncSession):
+    # Однаково для POST, PUT і пакетного PATCH: зайнятий email - 409, решта IntegrityError - як є
     try:
-        yield db
-    finally:
-        db.close()
+        yield
+    except IntegrityError as e:
+        await db.rollback()
+        if crud.is_email_conflict(e):
+            raise HTTPException(status_code=409, detail="Email is already used by another contact")
+        raise
 
 @router.post("/", response_model=schemas.ContactResponse)
-def create_contact(
+async def create_contact(
     contact: schemas.ContactCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: schemas.UserResponse = Depends(get_current_user)
 ):
-    return crud.create_contact(db, contact, current_user.id)
+    async with _email_conflict(db):
+        return await crud.create_contact(db, contact, current_user.id)
 
-@router.get("/", response_model=list[schemas.ContactResponse])
-def get_contacts(
-    db: Session = Depends(get_db),
+@router.get("/", response_model=schemas.ContactPage, response_model_exclude_unset=True)
+async def get_contacts(
+    request: Request,
+    limit: int = Query(settings.contacts_page_size, ge=1, le=settings.contacts_max_page_size),
+    cursor: Optional[str] = Query(None, description="Opaque cursor returned as next_cursor"),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return, id is always included"),
+    db: AsyncSession = Depends(get_read_db),
     current_user: schemas.UserResponse = Depends(get_current_user)
 ):
-    return crud.get_contacts(db, current_user.id)
+    try:
+        after_id = decode_cursor(cursor) if cursor else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    selected = None
+    if fields:
+        requested = [name.strip() for name in fields.split(",") if name.strip()]
+        unknown = set(requested) - set(crud.CONTACT_FIELDS)
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(sorted(unknown))}")
+        selected = ["id"] + [name for name in dict.fromkeys(requested) if name != "id"]
+
+    async def build():
+        rows = await crud.get_contacts(db, current_user.id, limit + 1, after_id, selected)
+        next_cursor = encode_cursor(rows[limit - 1].id) if len(rows) > limit else None
+        return dump_rows(rows[:limit], next_cursor=next_cursor)
+
+    params = {"limit": limit, "after_id": after_id, "fields": ",".join(selected) if selected else None}
+    return await cached_response(request, db, current_user.id, "contacts", params, build)
+
+IMPORT_CONTENT_TYPES = {
+    "text/csv": "csv",
+    "application/x-ndjson": "ndjson",
+    "application/ndjson": "ndjson",
+    "application/jsonl": "ndjson",
+}
+
+@router.post("/import", response_model=schemas.ImportJobResponse, status_code=202)
+async def import_contacts(
+    request: Request,
+    format: Optional[str] = Query(None, description="csv or ndjson; taken from Content-Type when omitted"),
+    db: AsyncSession = Depends(get_db),
+    current_user: schemas.UserResponse = Depends(get_current_user)
+):
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    format = format or IMPORT_CONTENT_TYPES.get(content_type)
+    if format not in IMPORT_FORMATS:
+        raise HTTPException(status_code=415, detail="Send text/csv or application/x-ndjson, or pass ?format=")
+
+    file_path = await spool_upload(request, format)
+    job = await crud.create_import_job(db, current_user.id, format, file_path)
+    start_import(job.id)
+    return job
+
+@router.get("/import/{job_id}", response_model=schemas.ImportJobResponse)
+async def get_import_job(
+    job_id: int,
+    db: AsyncSession = Depends(get_db),
+    current_user: schemas.UserResponse = Depends(get_current_user)
+):
+    job = await crud.get_import_job(db, job_id, current_user.id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Import job not found")
+    return job
+
+@router.get("/export", response_class=StreamingResponse)
+async def export_contacts(
+    request: Request,
+    format: str = Query("ndjson", pattern="^(ndjson|csv|vcard)$"),
+    current_user: schemas.UserResponse = Depends(get_current_user)
+):
+    compress = export.accepts_gzip(request.headers.get("accept-encoding", ""))
+    headers = {
+        "Content-Disposition": f'attachment; filename="contacts.{export.EXTENSIONS[format]}"',
+        "Vary": "Accept-Encoding",
+    }
+    if compress:
+        headers["Content-Encoding"] = "gzip"
+    return StreamingResponse(
+        export.export_contacts(current_user.id, format, compress),
+        media_type=export.MEDIA_TYPES[format],
+        headers=headers,
+    )
+
+def _check_batch(ids: list[int]):
+    if len(ids) > settings.contacts_batch_max:
+        raise HTTPException(status_code=413, detail=f"Batch is limited to {settings.contacts_batch_max} items")
+    if len(set(ids)) != len(ids):
+        raise HTTPException(status_code=400, detail="Duplicate contact ids in batch")
+
+@router.patch("/batch", response_model=schemas.BatchResult)
+async def update_contacts_batch(
+    patches: list[schemas.ContactBatchUpdate],
+    db: AsyncSession = Depends(get_db),
+    current_user: schemas.UserResponse = Depends(get_current_user)
+):
+    ids = [patch.id for patch in patches]
+    _check_batch(ids)
+    # Пачка атомарна: конфлікт email скасовує всі зміни
+    async with _email_conflict(db):
+        updated = await crud.update_contacts_batch(db, patches, current_user.id)
+    return {"results": [{"id": id, "status": "updated" if id in updated else "not_found"} for id in ids]}
+
+@router.post("/batch/delete", response_model=schemas.BatchResult)
+async def delete_contacts_batch(
+    batch: schemas.ContactBatchDelete,
+    db: AsyncSession = Depends(get_db),
+    current_user: schemas.UserResponse = Depends(get_current_user)
+):
+    _check_batch(batch.ids)
+    deleted = await crud.delete_contacts_batch(db, batch.ids, current_user.id)
+    return {"results": [{"id": id, "status": "deleted" if id in deleted else "not_found"} for id in batch.ids]}
+
+async def _sync_page(db: AsyncSession, user_id: int, since: int, limit: int, full: bool):
+    """Сторінка /contacts/sync або None, якщо репліка відстає від since і відповідати має primary."""
+    # High-water mark читається до змін: рядок, закомічений між запитами, потрапить у наступний sync
+    version, purged_version = await crud.get_sync_state(db, user_id)
+    if since > version and db.info.get("replica"):
+        # Клієнт бачив версію з primary чи свіжішої репліки: це відставання, а не відновлення з бекапу
+        return None
+    # since старший за компактизацію - частина видалень клієнту вже не дістанеться. Під час повного
+    # sync живі рядки бувають старші за межу компактизації, тож наступні сторінки (full) не перевіряються.
+    # since більший за версію на primary - дані відновлені з бекапу.
+    reset = since > 0 and (since > version or (not full and since < purged_version))
+    start = 0 if reset else since
+    rows = await crud.get_contact_changes(db, user_id, start, limit + 1)
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    next_version = rows[-1].version if has_more else max([version, start] + [row.version for row in rows[-1:]])
+    return dump_changes(rows, version=next_version, has_more=has_more, reset=reset)
+
+@router.get("/sync", response_model=schemas.ContactSyncPage)
+async def sync_contacts(
+    request: Request,
+    since: int = Query(0, ge=0, description="version from the previous sync response, 0 for a full sync"),
+    limit: int = Query(settings.contacts_page_size, ge=1, le=settings.contacts_max_page_size),
+    full: bool = Query(False, description="continuing a full sync (since=0 or reset) with has_more"),
+    db: AsyncSession = Depends(get_read_db),
+    current_user: schemas.UserResponse = Depends(get_current_user)
+):
+    async def build():
+        page = await _sync_page(db, current_user.id, since, limit, full)
+        if page is None:
+            async with SessionLocal() as primary:
+                page = await _sync_page(primary, current_user.id, since, limit, full)
+        return page
+
+    return await cached_response(request, db, current_user.id, "sync", {"since": since, "limit": limit, "full": full}, build)
 
 @router.get("/{contact_id}", response_model=schemas.ContactResponse)
-def get_contact(
+async def get_contact(
     contact_id: int,
-    db: Session = Depends(get_db),
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_read_db),
     current_user: schemas.UserResponse = Depends(get_current_user)
 ):
-    db_contact = crud.get_contact_by_id(db, contact_id, current_user.id)
+    version = await crud.get_contacts_version(db, current_user.id)
+    etag = make_etag("contact", current_user.id, version, contact_id)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    apply_cache_headers(response, etag)
+
+    db_contact = await crud.get_contact_by_id(db, contact_id, current_user.id)
     if db_contact is None:
         raise HTTPException(status_code=404, detail="Contact not found")
     return db_contact
 
 @router.delete("/{contact_id}", response_model=schemas.ContactResponse)
-def delete_contact(
+async def delete_contact(
     contact_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: schemas.UserResponse = Depends(get_current_user)
 ):
-    db_contact = crud.delete_contact(db, contact_id, current_user.id)
+    db_contact = await crud.delete_contact(db, contact_id, current_user.id)
     if db_contact is None:
         raise HTTPException(status_code=404, detail="Contact not found")
     return db_contact
 
 @router.put("/{contact_id}", response_model=schemas.ContactResponse)
-def update_contact(
+async def update_contact(
     contact_id: int,
     contact: schemas.ContactUpdate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: schemas.UserResponse = Depends(get_current_user)
 ):
-    db_contact = crud.update_contact(db, contact_id, contact, current_user.id)
+    async with _email_conflict(db):
+        db_contact = await crud.update_contact(db, contact_id, contact, current_user.id)
     if db_contact is None:
         raise HTTPException(status_code=404, detail="Contact not found")
     return db_contact
@@ -67,23 +233,39 @@ def update_contact(
 
 
 @router.get("/search/", response_model=list[schemas.ContactResponse])
-def search_contacts_api(
+async def search_contacts_api(
+    request: Request,
+    q: str = Query(None, description="Prefix/fuzzy search by name, email, phone or extra info"),
     name: str = Query(None, description="Search by first or last name"),
     email: str = Query(None, description="Search by email"),
-    db: Session = Depends(get_db),
+    limit: int = Query(settings.search_default_limit, ge=1, le=settings.search_max_limit),
+    db: AsyncSession = Depends(get_read_db),
     current_user: schemas.UserResponse = Depends(get_current_user)
 ):
-    contacts = search_contacts(db, name, email, current_user.id)
-    if not contacts:
-        raise HTTPException(status_code=404, detail="No contacts found")
-    return contacts
+    async def build():
+        contacts = await search_contacts(db, current_user.id, q, email, limit, name=name)
+        if not contacts:
+            raise HTTPException(status_code=404, detail="No contacts found")
+        return dump_contacts(contacts)
+
+    params = {"q": q, "name": name, "email": email, "limit": limit}
+    return await cached_response(request, db, current_user.id, "search", params, build)
 
 @router.get("/upcoming_birthdays/", response_model=list[schemas.ContactResponse])
-def get_birthdays_api(
-    db: Session = Depends(get_db),
+async def get_birthdays_api(
+    request: Request,
+    days: int = Query(7, ge=1, le=365, description="Size of the window in days, starting today"),
+    limit: int = Query(settings.contacts_page_size, ge=1, le=settings.contacts_max_page_size),
+    offset: int = Query(0, ge=0),
+    db: AsyncSession = Depends(get_read_db),
     current_user: schemas.UserResponse = Depends(get_current_user)
 ):
-    contacts = get_upcoming_birthdays(db, current_user.id)
-    if not contacts:
-        raise HTTPException(status_code=404, detail="No upcoming birthdays found")
-    return contacts
\ No newline at end of file
+    async def build():
+        contacts = await get_upcoming_birthdays(db, current_user.id, days, limit, offset)
+        if not contacts:
+            raise HTTPException(status_code=404, detail="No upcoming birthdays found")
+        return dump_contacts(contacts)
+
+    # Результат залежить і від сьогоднішньої дати, тому вона входить у ключ кешу та ETag
+    params = {"today": date.today(), "days": days, "limit": limit, "offset": offset}
+    return await cached_response(request, db, current_user.id, "birthdays", params, build)
\ No newline at end of file
@@ -0,0 +1,62 @@
+import hmac
+import ipaddress
+
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from prometheus_client import CONTENT_TYPE_LATEST
+
+from app.config import settings
+from app.database import db, replicas
+from app.database.pool_metrics import pool_snapshot
+from app.services import changes, instrumentation, rate_limit, response_cache
+
+_allowed_networks = [ipaddress.ip_network(network) for network in settings.metrics_allowed_ips]
+
+
+def _from_allowed_network(request: Request) -> bool:
+    try:
+        ip = ipaddress.ip_address(request.client.host if request.client else "")
+    except ValueError:
+        return False
+    return any(ip in network for network in _allowed_networks)
+
+
+async def _authorize(request: Request):
+    scheme, _, token = request.headers.get("authorization", "").partition(" ")
+    if settings.metrics_token and scheme.lower() == "bearer" and hmac.compare_digest(token, settings.metrics_token):
+        return
+    if _from_allowed_network(request):
+        return
+    if not settings.metrics_token and not _allowed_networks:
+        # Не налаштовано жодного доступу - ендпоінтів ніби й немає
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+    raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Forbidden")
+
+
+router = APIRouter(prefix="/metrics", tags=["Metrics"], dependencies=[Depends(_authorize)])
+
+
+@router.get("", include_in_schema=False)
+async def get_prometheus_metrics():
+    return Response(instrumentation.render(), media_type=CONTENT_TYPE_LATEST)
+
+
+@router.get("/pool")
+async def get_pool_metrics():
+    if db.engine is None:
+        return {}
+    return {"primary": pool_snapshot(db.engine.sync_engine), "replicas": replicas.snapshot(), "reads": replicas.stats}
+
+
+@router.get("/cache")
+async def get_cache_metrics():
+    return {"responses": response_cache.snapshot()}
+
+
+@router.get("/changes")
+async def get_change_feed_metrics():
+    return changes.snapshot()
+
+
+@router.get("/rate-limit")
+async def get_rate_limit_metrics():
+    return rate_limit.snapshot()
@@ -1,31 +1,18 @@
 from fastapi import APIRouter, HTTPException, Depends
-from sqlalchemy.orm import Session
-from app.config import SessionLocal
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database.db import get_db
 import app.database.schemas as schemas
 import app.database.crud as crud
+from app.services.rate_limit import limit_by_ip
 
 
 router = APIRouter(prefix="/users", tags=["Users"])
 
-
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
-
-print("USERS ROUTER LOADED")
-print("ROUTE /users/signup/ should be registered")
-
-@router.post("/signup", response_model=schemas.UserResponse, status_code=201)
-def signup(user_data: schemas.UserCreate, db: Session = Depends(get_db)):
-    existing_user = crud.get_user_by_email(db, user_data.email)
-    if existing_user:
+@router.post("/signup", response_model=schemas.UserResponse, status_code=201, dependencies=[Depends(limit_by_ip("signup"))])
+async def signup(user_data: schemas.UserCreate, db: AsyncSession = Depends(get_db)):
+    new_user = await crud.create_user(db, user_data)
+    if new_user is None:
         raise HTTPException(status_code=409, detail="Email already registered")
-
-    new_user = crud.create_user(db, user_data)
     return new_user
 
 
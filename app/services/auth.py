@@ -1,58 +1,49 @@
-import os
-from datetime import datetime, timedelta
+from datetime import timedelta
 from typing import Optional
 
-from jose import JWTError, jwt
+from jose import JWTError
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
-from dotenv import load_dotenv
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.config import SessionLocal
-from app.database import crud
+from app.database import crud, replicas, schemas
+from app.database.db import get_db
+from app.services import tokens, user_cache
 
-load_dotenv()
-
-SECRET_KEY = os.getenv("SECRET_KEY", "your_secret_key_here")
-ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
-    to_encode = data.copy()
-    expire = datetime.utcnow() + (expires_delta or timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
-    to_encode.update({"exp": expire})
-    return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+    return tokens.create_token(data["sub"], tokens.ACCESS, expires_delta or timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
 
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+async def user_from_token(token: str, db: AsyncSession) -> schemas.UserResponse:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        user_email: str = payload.get("sub")
-        if user_email is None:
-            raise credentials_exception
+        user_email: str = tokens.verify_token(token, tokens.ACCESS)["sub"]
     except JWTError:
         raise credentials_exception
 
-    user = crud.get_user_by_email(db, user_email)
+    user = await user_cache.get(user_email)
     if user is None:
-        raise credentials_exception
+        db_user = await crud.get_user_by_email(db, user_email)
+        if db_user is None:
+            raise credentials_exception
+        user = schemas.UserResponse.model_validate(db_user)
+        await user_cache.set(user_email, user)
     return user
 
+async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_db)):
+    return await user_from_token(token, db)
+
+async def get_read_db(current_user: schemas.UserResponse = Depends(get_current_user)):
+    # Для ендпоінтів, що лише читають: репліка, якщо користувач нещодавно нічого не змінював
+    async with replicas.read_session(current_user.id) as db:
+        yield db
+
 def create_verification_token(email: str, expires_delta: timedelta = timedelta(hours=1)):
-    to_encode = {"sub": email}
-    expire = datetime.utcnow() + expires_delta
-    to_encode.update({"exp": expire})
-    return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
\ No newline at end of file
+    return tokens.create_token(email, tokens.EMAIL_VERIFY, expires_delta)
\ No newline at end of file
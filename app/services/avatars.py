@@ -0,0 +1,140 @@
+import asyncio
+import os
+import logging
+import uuid
+from abc import ABC, abstractmethod
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from fastapi import HTTPException, UploadFile, status
+from fastapi.staticfiles import StaticFiles
+from starlette.concurrency import run_in_threadpool
+
+from app.config import settings
+from app.services.image_processing import render_avatar
+
+logger = logging.getLogger(__name__)
+
+READ_CHUNK_SIZE = 64 * 1024
+
+
+class AvatarStorage(ABC):
+    @abstractmethod
+    async def save(self, name: str, data: bytes) -> str:
+        """Зберігає файл і повертає його публічний URL."""
+
+
+class LocalAvatarStorage(AvatarStorage):
+    def __init__(self, root: str, base_url: str):
+        self.root = root
+        self.base_url = base_url.rstrip("/")
+
+    def _write(self, path: str, data: bytes):
+        # Запис у тимчасовий файл + os.replace: читач ніколи не побачить наполовину записаний файл
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+    async def save(self, name: str, data: bytes) -> str:
+        path = os.path.join(self.root, name)
+        # Імена містять хеш вмісту: якщо файл уже є, він ідентичний
+        if not os.path.exists(path):
+            await run_in_threadpool(self._write, path, data)
+        return f"{self.base_url}/{name}"
+
+
+class MemoryAvatarStorage(AvatarStorage):
+    """Сховище в пам'яті - заміна для тестів (як і майбутнього S3-бекенду)."""
+
+    def __init__(self, base_url: str = "memory://avatars"):
+        self.base_url = base_url
+        self.files = {}
+
+    async def save(self, name: str, data: bytes) -> str:
+        self.files[name] = data
+        return f"{self.base_url}/{name}"
+
+
+class ImmutableStaticFiles(StaticFiles):
+    """Файли з хешем вмісту в імені ніколи не змінюються, тож їх можна кешувати назавжди."""
+
+    def file_response(self, *args, **kwargs):
+        response = super().file_response(*args, **kwargs)
+        response.headers["Cache-Control"] = "public, max-age=31536000, immutable"
+        return response
+
+
+STORAGES = {
+    "local": lambda: LocalAvatarStorage(settings.avatar_storage_path, settings.avatar_base_url),
+    "memory": MemoryAvatarStorage,
+}
+
+_storage = None
+_executor = None
+
+
+def get_storage() -> AvatarStorage:
+    global _storage
+    if _storage is None:
+        _storage = STORAGES[settings.avatar_storage]()
+    return _storage
+
+
+def set_storage(storage: AvatarStorage):
+    global _storage
+    _storage = storage
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(max_workers=settings.avatar_workers)
+    return _executor
+
+
+def shutdown_executor():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+async def read_upload(file: UploadFile) -> bytes:
+    chunks, size = [], 0
+    while chunk := await file.read(READ_CHUNK_SIZE):
+        size += len(chunk)
+        if size > settings.avatar_max_bytes:
+            raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail="Avatar file is too large")
+        chunks.append(chunk)
+    return b"".join(chunks)
+
+
+async def process_avatar(data: bytes) -> str:
+    """Нормалізує аватар у WebP кількох розмірів і повертає URL найбільшого."""
+    try:
+        digest, rendered = await asyncio.get_running_loop().run_in_executor(
+            _get_executor(), render_avatar, data, settings.avatar_sizes, settings.avatar_max_pixels
+        )
+    except BrokenProcessPool:
+        # Процес пулу вбили (OOM на величезному зображенні) - пул більше не приймає задач, створюємо новий
+        logger.error("Avatar process pool is broken, recreating it")
+        shutdown_executor()
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Image processing is temporarily unavailable",
+            headers={"Retry-After": "1"},
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except OSError:
+        # Pillow кидає OSError/UnidentifiedImageError для пошкоджених або не-графічних файлів
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid image file")
+
+    storage = get_storage()
+    urls = {}
+    for size, content in rendered.items():
+        urls[size] = await storage.save(f"{digest[:32]}_{size}.webp", content)
+    return urls[max(settings.avatar_sizes)]
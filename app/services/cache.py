@@ -0,0 +1,42 @@
+import time
+from collections import OrderedDict
+
+
+class LRUCache:
+    """Простий in-process LRU-кеш з TTL для кожного запису."""
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+
+    def get(self, key):
+        item = self._data.get(key)
+        if item is None:
+            return None
+        value, expires_at = item
+        if expires_at < time.monotonic():
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key, value, ttl: float = None):
+        self._data[key] = (value, time.monotonic() + (self.ttl if ttl is None else ttl))
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def delete(self, key):
+        self._data.pop(key, None)
+
+    def clear(self):
+        self._data.clear()
+
+    def values(self):
+        """Живі значення без оновлення порядку LRU."""
+        now = time.monotonic()
+        return [value for value, expires_at in list(self._data.values()) if expires_at >= now]
+
+    def __len__(self):
+        return len(self._data)
@@ -0,0 +1,191 @@
+import asyncio
+import logging
+from collections import defaultdict
+
+import orjson
+
+from app.config import get_redis, settings
+
+logger = logging.getLogger(__name__)
+
+CHANNEL_PREFIX = "contacts:changes:"
+
+# Номер події, журнал для відновлення і публікація - одним скриптом, тож порядок у журналі
+# збігається з порядком номерів. seq дописується на початок JSON-об'єкта з ARGV[1].
+PUBLISH_SCRIPT = """
+local seq = redis.call("INCR", KEYS[1])
+local message = '{"seq":' .. seq .. ',' .. string.sub(ARGV[1], 2)
+redis.call("ZADD", KEYS[2], seq, message)
+redis.call("ZREMRANGEBYRANK", KEYS[2], 0, -tonumber(ARGV[2]) - 1)
+redis.call("EXPIRE", KEYS[2], ARGV[3])
+redis.call("PUBLISH", ARGV[4], message)
+return seq
+"""
+
+stats = {"published": 0, "publish_errors": 0, "delivered": 0, "dropped": 0, "resets": 0}
+
+_script = None
+_listener = None
+_subscriptions = defaultdict(set)
+
+
+def _seq_key(user_id: int) -> str:
+    # Без TTL: якщо лічильник зникне, номери почнуться знову з 1 і клієнти отримають reset
+    return f"changes:seq:{user_id}"
+
+
+def _log_key(user_id: int) -> str:
+    return f"changes:log:{user_id}"
+
+
+async def publish(user_id: int, event_type: str, **payload):
+    """Надсилає подію всім потокам користувача в усіх воркерах. Без Redis подія губиться, запис - ні."""
+    global _script
+    message = orjson.dumps({"type": event_type, **payload})
+    try:
+        redis = get_redis()
+        if _script is None:
+            _script = redis.register_script(PUBLISH_SCRIPT)
+        await _script(
+            keys=[_seq_key(user_id), _log_key(user_id)],
+            args=[message, settings.changes_log_size, settings.changes_log_ttl, f"{CHANNEL_PREFIX}{user_id}"],
+        )
+    except Exception as e:
+        stats["publish_errors"] += 1
+        logger.warning("Change feed: event not published: %s", e, extra={"user_id": user_id})
+        return
+    stats["published"] += 1
+
+
+class _Subscription:
+    """Черга одного потоку. None у черзі - сигнал дочитати пропущене з журналу."""
+
+    def __init__(self, user_id: int):
+        self.user_id = user_id
+        self.queue = asyncio.Queue(maxsize=settings.changes_queue_size)
+
+    def push(self, message):
+        try:
+            self.queue.put_nowait(message)
+            stats["delivered"] += 1
+        except asyncio.QueueFull:
+            # Повільний клієнт не тримає пам'ять воркера: черга скидається, решту він дочитає з журналу
+            stats["dropped"] += self.queue.qsize()
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(None)
+
+
+async def _listen():
+    # Одна підписка на воркер; події роздаються локальним потокам за id користувача з назви каналу
+    while True:
+        pubsub = get_redis().pubsub()
+        try:
+            await pubsub.psubscribe(f"{CHANNEL_PREFIX}*")
+            # Поки підписки не було, події могли пройти повз - потоки звіряються з журналом
+            for subscriptions in _subscriptions.values():
+                for subscription in subscriptions:
+                    subscription.push(None)
+            async for message in pubsub.listen():
+                if message["type"] != "pmessage":
+                    continue
+                user_id = int(message["channel"].rsplit(b":", 1)[1])
+                for subscription in _subscriptions.get(user_id, ()):
+                    subscription.push(message["data"])
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning("Change feed: Redis subscription lost: %s", e)
+            await asyncio.sleep(1)
+        finally:
+            await pubsub.aclose()
+
+
+def _subscribe(user_id: int) -> _Subscription:
+    global _listener
+    if _listener is None:
+        _listener = asyncio.create_task(_listen())
+    subscription = _Subscription(user_id)
+    _subscriptions[user_id].add(subscription)
+    return subscription
+
+
+def _unsubscribe(subscription: _Subscription):
+    subscriptions = _subscriptions.get(subscription.user_id)
+    if subscriptions is not None:
+        subscriptions.discard(subscription)
+        if not subscriptions:
+            del _subscriptions[subscription.user_id]
+
+
+def _parse(message: bytes):
+    event = orjson.loads(message)
+    return event["seq"], event["type"]
+
+
+async def _catch_up(user_id: int, since):
+    """
+    Події після since з журналу: (останній seq, [(seq, тип, JSON-байти)]).
+    Якщо частини подій у журналі вже немає, повертається одна подія reset: клієнт
+    перечитує контакти повністю і продовжує з її seq.
+    """
+    redis = get_redis()
+    pipe = redis.pipeline(transaction=False)
+    pipe.get(_seq_key(user_id))
+    pipe.zrangebyscore(_log_key(user_id), f"({since or 0}", "+inf")
+    current, messages = await pipe.execute()
+    current = int(current or 0)
+
+    if since is None:
+        # Новий клієнт без історії: лише події, що прийдуть далі
+        return current, []
+    events = [(*_parse(message), message) for message in messages]
+    if since > current or (current > since and (not events or events[0][0] != since + 1)):
+        stats["resets"] += 1
+        return current, [(current, "reset", orjson.dumps({"seq": current, "type": "reset"}))]
+    return (events[-1][0] if events else since), events
+
+
+async def stream(user_id: int, since=None):
+    """
+    Асинхронний генератор подій користувача: (seq, тип, JSON-байти) або None - сигнал
+    надіслати heartbeat. Події після since спершу дочитуються з журналу, далі йдуть наживо.
+    """
+    # Підписка до читання журналу: подія між ними прийде двічі і відкинеться за seq, але не загубиться
+    subscription = _subscribe(user_id)
+    try:
+        last, events = await _catch_up(user_id, since)
+        for event in events:
+            yield event
+        while True:
+            try:
+                message = await asyncio.wait_for(subscription.queue.get(), settings.changes_heartbeat)
+            except asyncio.TimeoutError:
+                yield None
+                continue
+            if message is not None:
+                seq, event_type = _parse(message)
+                if seq <= last:
+                    continue
+                if seq == last + 1:
+                    last = seq
+                    yield seq, event_type, message
+                    continue
+            # Пропуск у номерах (переповнена черга, перепідключення до Redis) - дочитуємо з журналу
+            last, events = await _catch_up(user_id, last)
+            for event in events:
+                yield event
+    finally:
+        _unsubscribe(subscription)
+
+
+async def stop():
+    global _listener
+    if _listener is not None:
+        _listener.cancel()
+        await asyncio.gather(_listener, return_exceptions=True)
+        _listener = None
+
+
+def snapshot():
+    return {**stats, "streams": sum(len(subscriptions) for subscriptions in _subscriptions.values())}
@@ -1,33 +1,218 @@
-import os
-import requests
-from dotenv import load_dotenv
+import asyncio
+import json
+import logging
+import random
+import time
+import uuid
+from abc import ABC, abstractmethod
+from contextlib import suppress
 
-# Завантажуємо змінні середовища з .env
-load_dotenv()
+from app.config import get_redis, settings
+from app.services.instrumentation import timed
 
-MAILGUN_API_KEY = os.getenv("MAILGUN_API_KEY")
-MAILGUN_DOMAIN = os.getenv("MAILGUN_DOMAIN")
-MAILGUN_SENDER = os.getenv("MAILGUN_SENDER")
+logger = logging.getLogger(__name__)
 
-def send_email(subject: str, to_email: str, body: str):
+QUEUE_KEY = "email:queue"
+DELAYED_KEY = "email:delayed"
+DEAD_LETTER_KEY = "email:dead"
+# Кожен процес бере листи у власний список і тримає ключ живості; список процесу, чий ключ
+# зник, повертається в чергу іншими. Спільний список повертав би і листи, які ще надсилаються.
+PROCESSING_PREFIX = "email:processing:"
+ALIVE_PREFIX = "email:alive:"
+HEARTBEAT_INTERVAL = 10
+
+_instance_id = uuid.uuid4().hex
+PROCESSING_KEY = f"{PROCESSING_PREFIX}{_instance_id}"
+ALIVE_KEY = f"{ALIVE_PREFIX}{_instance_id}"
+
+
+class EmailTransport(ABC):
+    @abstractmethod
+    async def send(self, message: dict):
+        ...
+
+    async def close(self):
+        pass
+
+
+class MailgunTransport(EmailTransport):
     """
-    Надсилає email за допомогою Mailgun API.
+    Надсилає email за допомогою Mailgun API через один пул HTTP-з'єднань.
     """
-    if not MAILGUN_API_KEY or not MAILGUN_DOMAIN or not MAILGUN_SENDER:
-        raise ValueError("Mailgun API Key, Domain або Sender Email не налаштовані")
-
-    url = f"https://api.mailgun.net/v3/{MAILGUN_DOMAIN}/messages"
-    auth = ("api", MAILGUN_API_KEY)
-    data = {
-        "from": f"Admin <{MAILGUN_SENDER}>",
-        "to": [to_email],
-        "subject": subject,
-        "text": body
-    }
-
-    response = requests.post(url, auth=auth, data=data)
-
-    if response.status_code == 200:
-        print(f"Email надіслано на {to_email}")
-    else:
-        print(f"Помилка відправки email: {response.status_code}, {response.text}")
\ No newline at end of file
+
+    def __init__(self):
+        if not settings.mailgun_api_key or not settings.mailgun_domain or not settings.mailgun_sender:
+            raise ValueError("Mailgun API Key, Domain або Sender Email не налаштовані")
+        # httpx імпортується лише тут: воркери без Mailgun (local, тести) його не вантажать
+        import httpx
+
+        self.client = httpx.AsyncClient(
+            base_url=f"https://api.mailgun.net/v3/{settings.mailgun_domain}",
+            auth=("api", settings.mailgun_api_key),
+            timeout=httpx.Timeout(10.0),
+            limits=httpx.Limits(max_connections=10, max_keepalive_connections=10),
+        )
+
+    async def send(self, message: dict):
+        response = await self.client.post("/messages", data={
+            "from": f"Admin <{settings.mailgun_sender}>",
+            "to": [message["to"]],
+            "subject": message["subject"],
+            "text": message["body"],
+        })
+        response.raise_for_status()
+
+    async def close(self):
+        await self.client.aclose()
+
+
+class LocalTransport(EmailTransport):
+    """
+    Нічого не надсилає: листи складаються в outbox (для тестів і локальної розробки).
+    """
+
+    def __init__(self):
+        self.outbox = []
+
+    async def send(self, message: dict):
+        self.outbox.append(message)
+        logger.info("Email stored locally", extra={"to": message["to"], "subject": message["subject"]})
+
+
+TRANSPORTS = {"mailgun": MailgunTransport, "local": LocalTransport}
+
+_transport = None
+_workers = []
+
+
+def get_transport() -> EmailTransport:
+    global _transport
+    if _transport is None:
+        _transport = TRANSPORTS[settings.email_transport]()
+    return _transport
+
+
+def set_transport(transport: EmailTransport):
+    global _transport
+    _transport = transport
+
+
+async def send_email(subject: str, to_email: str, body: str):
+    """
+    Ставить лист у чергу Redis і одразу повертає керування; відправляє email-воркер.
+    """
+    message = {"id": uuid.uuid4().hex, "to": to_email, "subject": subject, "body": body, "attempts": 0}
+    try:
+        await get_redis().lpush(QUEUE_KEY, json.dumps(message))
+    except Exception:
+        # Redis недоступний - краще надіслати одразу, ніж загубити лист
+        logger.exception("Email queue unavailable, sending synchronously", extra={"to": to_email})
+        try:
+            with timed("email_send"):
+                await get_transport().send(message)
+        except Exception:
+            # Запис, заради якого лист, уже закомічений: помилка відправки не має ставати 500
+            logger.exception("Email not sent", extra={"email_id": message["id"], "to": to_email})
+
+
+def _retry_delay(attempts: int) -> float:
+    delay = min(settings.email_retry_base_delay * 2 ** (attempts - 1), settings.email_retry_max_delay)
+    return delay * random.uniform(0.8, 1.2)
+
+
+async def _process(redis, transport: EmailTransport, raw: bytes):
+    message = json.loads(raw)
+    try:
+        with timed("email_send"):
+            await transport.send(message)
+        logger.info("Email sent", extra={"email_id": message["id"], "to": message["to"]})
+    except Exception as e:
+        message["attempts"] += 1
+        message["last_error"] = str(e)
+        if message["attempts"] >= settings.email_max_attempts:
+            logger.error("Email moved to dead letters", extra={"email_id": message["id"], "error": str(e)})
+            await redis.lpush(DEAD_LETTER_KEY, json.dumps(message))
+        else:
+            retry_at = time.time() + _retry_delay(message["attempts"])
+            await redis.zadd(DELAYED_KEY, {json.dumps(message): retry_at})
+    finally:
+        await redis.lrem(PROCESSING_KEY, 1, raw)
+
+
+async def _promote_due(redis):
+    for raw in await redis.zrangebyscore(DELAYED_KEY, 0, time.time(), start=0, num=100):
+        # zrem повертає 1 лише одному з воркерів, тож лист не задвоюється
+        if await redis.zrem(DELAYED_KEY, raw):
+            await redis.lpush(QUEUE_KEY, raw)
+
+
+async def _worker(transport: EmailTransport):
+    redis = get_redis()
+    while True:
+        try:
+            await _promote_due(redis)
+            raw = await redis.blmove(QUEUE_KEY, PROCESSING_KEY, 1, "RIGHT", "LEFT")
+            if raw is not None:
+                await _process(redis, transport, raw)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("Email worker error")
+            await asyncio.sleep(1)
+
+
+async def _recover_orphans(redis):
+    # Листи процесів, що впали, повертаються в чергу (доставка at-least-once).
+    # lmove атомарний, тож кілька процесів, які відновлюють одночасно, лист не задвоюють.
+    async for key in redis.scan_iter(match=f"{PROCESSING_PREFIX}*"):
+        instance_id = key.decode().removeprefix(PROCESSING_PREFIX)
+        if instance_id == _instance_id or await redis.exists(f"{ALIVE_PREFIX}{instance_id}"):
+            continue
+        moved = 0
+        while await redis.lmove(key, QUEUE_KEY, "RIGHT", "LEFT"):
+            moved += 1
+        if moved:
+            logger.warning("Recovered in-flight emails", extra={"instance_id": instance_id, "count": moved})
+
+
+async def _beat():
+    try:
+        redis = get_redis()
+        await redis.set(ALIVE_KEY, 1, ex=HEARTBEAT_INTERVAL * 3)
+        await _recover_orphans(redis)
+    except Exception:
+        logger.exception("Email heartbeat failed")
+
+
+async def _heartbeat():
+    while True:
+        await asyncio.sleep(HEARTBEAT_INTERVAL)
+        await _beat()
+
+
+async def start_email_workers():
+    try:
+        transport = get_transport()
+    except ValueError:
+        logger.exception("Email transport is not configured, emails stay queued")
+        return
+    # Ключ живості ставиться до того, як воркери беруть листи, інакше їх могли б "відновити" інші процеси
+    await _beat()
+    _workers.append(asyncio.create_task(_heartbeat()))
+    for _ in range(settings.email_workers):
+        _workers.append(asyncio.create_task(_worker(transport)))
+
+
+async def stop_email_workers():
+    for task in _workers:
+        task.cancel()
+    await asyncio.gather(*_workers, return_exceptions=True)
+    _workers.clear()
+    with suppress(Exception):
+        # Листи, які не встигли надіслати, одразу повертаються в чергу, не чекаючи зникнення ключа живості
+        redis = get_redis()
+        while await redis.lmove(PROCESSING_KEY, QUEUE_KEY, "RIGHT", "LEFT"):
+            pass
+        await redis.delete(ALIVE_KEY)
+    if _transport is not None:
+        await _transport.close()
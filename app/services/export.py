@@ -0,0 +1,117 @@
+import csv
+import io
+import zlib
+
+import orjson
+from sqlalchemy import select
+
+from app.config import settings
+from app.database.crud import CONTACT_FIELDS, LIVE
+from app.database.db import SessionLocal
+from app.database.models import Contact
+
+MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+    "vcard": "text/vcard; charset=utf-8",
+}
+EXTENSIONS = {"ndjson": "ndjson", "csv": "csv", "vcard": "vcf"}
+
+EXPORT_FIELDS = [name for name in CONTACT_FIELDS if name != "user_id"]
+
+
+def accepts_gzip(accept_encoding: str) -> bool:
+    """gzip явно перелічений в Accept-Encoding з q > 0; "gzip;q=0" - відмова, x-gzip - інше кодування."""
+    for item in accept_encoding.split(","):
+        coding, *params = [part.strip() for part in item.split(";")]
+        if coding.lower() != "gzip":
+            continue
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    return float(value) > 0
+                except ValueError:
+                    return False
+        return True
+    return False
+
+
+async def _batches(user_id: int):
+    # Сесія відкривається тут, а не через Depends: відповідь стрімиться вже після завершення залежностей.
+    # yield_per вмикає серверний курсор, тож у пам'яті лише одна пачка рядків.
+    async with SessionLocal() as db:
+        stmt = (
+            select(*[getattr(Contact, name) for name in EXPORT_FIELDS])
+            .where(Contact.user_id == user_id, LIVE)
+            .order_by(Contact.id)
+            .execution_options(yield_per=settings.export_batch_size)
+        )
+        result = await db.stream(stmt)
+        async for rows in result.partitions():
+            yield rows
+
+
+def _ndjson(rows) -> bytes:
+    return b"".join(orjson.dumps(row._asdict()) + b"\n" for row in rows)
+
+
+def _csv(rows, header: bool) -> bytes:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header:
+        writer.writerow(EXPORT_FIELDS)
+    writer.writerows(rows)
+    return buffer.getvalue().encode()
+
+
+def _vcard_escape(value) -> str:
+    return (
+        str(value).replace("\\", "\\\\").replace(",", "\\,").replace(";", "\\;")
+        .replace("\r\n", "\\n").replace("\n", "\\n")
+    )
+
+
+def _vcard(rows) -> bytes:
+    cards = []
+    for row in rows:
+        lines = [
+            "BEGIN:VCARD",
+            "VERSION:3.0",
+            f"N:{_vcard_escape(row.last_name)};{_vcard_escape(row.first_name)};;;",
+            f"FN:{_vcard_escape(row.first_name)} {_vcard_escape(row.last_name)}",
+            f"EMAIL;TYPE=INTERNET:{_vcard_escape(row.email)}",
+            f"TEL:{_vcard_escape(row.phone)}",
+        ]
+        if row.birthday:
+            lines.append(f"BDAY:{row.birthday.isoformat()}")
+        if row.extra_info:
+            lines.append(f"NOTE:{_vcard_escape(row.extra_info)}")
+        lines.append("END:VCARD")
+        cards.append("\r\n".join(lines) + "\r\n")
+    return "".join(cards).encode()
+
+
+async def export_contacts(user_id: int, format: str, compress: bool = False):
+    """Асинхронний генератор байтів для StreamingResponse."""
+    compressor = zlib.compressobj(wbits=16 + zlib.MAX_WBITS) if compress else None
+    first = True
+    async for rows in _batches(user_id):
+        if format == "ndjson":
+            chunk = _ndjson(rows)
+        elif format == "csv":
+            chunk = _csv(rows, header=first)
+        else:
+            chunk = _vcard(rows)
+        first = False
+
+        if compressor:
+            chunk = compressor.compress(chunk)
+        if chunk:
+            yield chunk
+
+    if format == "csv" and first:
+        chunk = _csv([], header=True)
+        yield compressor.compress(chunk) if compressor else chunk
+    if compressor:
+        yield compressor.flush()
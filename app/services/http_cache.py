@@ -0,0 +1,61 @@
+import hashlib
+
+from fastapi import Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import crud
+from app.services import response_cache
+
+
+def make_etag(*parts) -> str:
+    digest = hashlib.sha256("|".join(str(part) for part in parts).encode()).hexdigest()
+    return f'"{digest[:32]}"'
+
+
+def cache_headers(etag: str) -> dict:
+    # private + no-cache: відповідь залежить від користувача, клієнт щоразу ревалідує її по ETag
+    return {"ETag": etag, "Cache-Control": "private, no-cache", "Vary": "Authorization"}
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    # Для If-None-Match діє слабке порівняння: префікс W/ ігнорується
+    candidates = {candidate.strip().removeprefix("W/") for candidate in header.split(",")}
+    return etag in candidates
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers=cache_headers(etag))
+
+
+def apply_cache_headers(response: Response, etag: str):
+    response.headers.update(cache_headers(etag))
+
+
+async def cached_response(request: Request, db: AsyncSession, user_id: int, endpoint: str, params: dict, build):
+    """
+    Віддає JSON-відповідь з кешу або будує її через build() -> bytes і кладе в кеш разом з ETag.
+    Кеш спрацьовує до звернення до БД; на промаху ETag рахується від версії контактів користувача.
+    """
+    key = await response_cache.make_key(user_id, endpoint, params)
+    if key is not None:
+        entry = await response_cache.get(key)
+        if entry is not None:
+            etag, body = entry
+            if etag_matches(request, etag):
+                return not_modified(etag)
+            return Response(content=body, media_type="application/json", headers=cache_headers(etag))
+
+    version = await crud.get_contacts_version(db, user_id)
+    etag = make_etag(endpoint, user_id, version, *sorted(params.items()))
+    if etag_matches(request, etag):
+        return not_modified(etag)
+
+    body = await build()
+    if key is not None and not db.info.get("replica"):
+        await response_cache.set(key, etag, body)
+    return Response(content=body, media_type="application/json", headers=cache_headers(etag))
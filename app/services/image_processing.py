@@ -0,0 +1,40 @@
+import hashlib
+import io
+
+ALLOWED_FORMATS = {"JPEG", "PNG", "WEBP", "GIF"}
+
+
+def render_avatar(data: bytes, sizes: tuple, max_pixels: int) -> tuple[str, dict]:
+    """
+    Декодує зображення, обрізає до квадрата і повертає (sha256, {розмір: WebP-байти}).
+    Виконується в пулі процесів, тому модуль не імпортує нічого з app.
+    """
+    # Pillow потрібен лише процесам пулу - головний процес його не вантажить
+    from PIL import Image, ImageOps
+
+    with Image.open(io.BytesIO(data)) as image:
+        # Формат визначається за вмістом файлу, а не за розширенням від клієнта
+        if image.format not in ALLOWED_FORMATS:
+            raise ValueError(f"Unsupported image format: {image.format}")
+        width, height = image.size
+        if width * height > max_pixels:
+            raise ValueError("Image is too large")
+
+        # Прозорість буває не лише в альфа-каналі: P/L/RGB з tRNS (PNG), GIF з transparency
+        transparent = image.has_transparency_data
+        largest = max(sizes)
+        # Для JPEG декодер одразу зменшує зображення (DCT scaling) - значно швидше за повне декодування
+        image.draft("RGB", (largest, largest))
+        image = ImageOps.exif_transpose(image)
+        image = image.convert("RGBA" if transparent else "RGB")
+        image = ImageOps.fit(image, (largest, largest), Image.Resampling.LANCZOS)
+
+        rendered = {}
+        for size in sorted(sizes, reverse=True):
+            resized = image if size == largest else image.resize((size, size), Image.Resampling.LANCZOS)
+            buffer = io.BytesIO()
+            resized.save(buffer, "WEBP", quality=85, method=4)
+            rendered[size] = buffer.getvalue()
+
+    digest = hashlib.sha256(rendered[largest]).hexdigest()
+    return digest, rendered
@@ -0,0 +1,159 @@
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from prometheus_client import CollectorRegistry, Counter, Histogram, REGISTRY, generate_latest, multiprocess
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+from sqlalchemy import event
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+http_requests = Counter("http_requests_total", "HTTP requests", ["method", "route", "status"])
+http_latency = Histogram("http_request_duration_seconds", "HTTP request latency", ["method", "route"], buckets=LATENCY_BUCKETS)
+db_queries = Counter("db_queries_total", "SQL statements executed")
+db_latency = Histogram("db_query_duration_seconds", "SQL statement latency", buckets=LATENCY_BUCKETS)
+db_queries_per_request = Histogram(
+    "db_queries_per_request", "SQL statements per HTTP request", ["route"], buckets=(0, 1, 2, 3, 5, 10, 20, 50)
+)
+operation_latency = Histogram(
+    "operation_duration_seconds", "Latency of expensive operations", ["operation"], buckets=LATENCY_BUCKETS
+)
+
+# Таймінги поточного запиту для Server-Timing: {назва: [кількість, секунди]}
+_timings: ContextVar = ContextVar("request_timings", default=None)
+
+
+def _record(name: str, seconds: float):
+    timings = _timings.get()
+    if timings is not None:
+        entry = timings.setdefault(name, [0, 0.0])
+        entry[0] += 1
+        entry[1] += seconds
+
+
+@contextmanager
+def timed(operation: str):
+    """Міряє операцію (bcrypt, jwt, email) у Prometheus і в Server-Timing поточного запиту."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        operation_latency.labels(operation).observe(elapsed)
+        _record(operation, elapsed)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_start"].pop()
+    db_queries.inc()
+    db_latency.observe(elapsed)
+    _record("db", elapsed)
+
+
+def _handle_error(exception_context):
+    starts = exception_context.connection.info.get("query_start") if exception_context.connection else None
+    if starts:
+        starts.pop()
+
+
+def track_query_timing(sync_engine):
+    event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(sync_engine, "handle_error", _handle_error)
+
+
+@contextmanager
+def request_timings():
+    timings = {}
+    token = _timings.set(timings)
+    try:
+        yield timings
+    finally:
+        _timings.reset(token)
+
+
+def server_timing(timings: dict, total: float) -> str:
+    parts = [f"app;dur={total * 1000:.1f}"]
+    for name, (count, seconds) in timings.items():
+        parts.append(f'{name};dur={seconds * 1000:.1f};desc="{count}x"')
+    return ", ".join(parts)
+
+
+class StatsCollector:
+    """Віддає в Prometheus внутрішню статистику пулу з'єднань, кешів і rate limiter-а."""
+
+    def describe(self):
+        # Без describe() REGISTRY.register викликає collect() одразу, ще під час імпорту db.py
+        return []
+
+    def collect(self):
+        # Імпорт тут: db.py сам імпортує цей модуль, щоб підключити таймінги запитів
+        from app.database import db, replicas
+        from app.database.pool_metrics import pool_snapshot
+        from app.services import changes, rate_limit, response_cache, tokens
+
+        # До старту lifespan engine ще не створений
+        if db.engine is not None:
+            pool = pool_snapshot(db.engine.sync_engine)
+            for name in ("size", "checked_in", "checked_out", "overflow", "open_connections"):
+                yield GaugeMetricFamily(f"db_pool_{name}", f"Connection pool {name}", value=pool[name])
+            yield CounterMetricFamily("db_pool_timeouts", "Connection pool checkout timeouts", value=pool["timeouts"])
+
+        reads = CounterMetricFamily("db_read_sessions", "Read-only sessions by target", labels=["target"])
+        for name, value in replicas.stats.items():
+            reads.add_metric([name], value)
+        yield reads
+        healthy = GaugeMetricFamily("db_replica_healthy", "Replica passes health and lag checks", labels=["replica"])
+        lag = GaugeMetricFamily("db_replica_lag_seconds", "Replica replay lag", labels=["replica"])
+        for name, replica in replicas.snapshot().items():
+            healthy.add_metric([name], int(replica["healthy"]))
+            if replica["lag"] is not None:
+                lag.add_metric([name], replica["lag"])
+        yield healthy
+        yield lag
+
+        cache = CounterMetricFamily("response_cache_events", "Response cache events", labels=["event"])
+        for name, value in response_cache.snapshot().items():
+            if name != "l1_entries":
+                cache.add_metric([name], value)
+        yield cache
+
+        limiter = CounterMetricFamily("rate_limit_decisions", "Rate limiter decisions", labels=["decision"])
+        syncs = CounterMetricFamily("rate_limit_syncs", "Rate limiter Redis synchronizations", labels=["outcome"])
+        for name, value in rate_limit.stats.items():
+            if name == "syncs":
+                syncs.add_metric(["ok"], value)
+            elif name == "sync_errors":
+                syncs.add_metric(["error"], value)
+            else:
+                limiter.add_metric([name], value)
+        yield limiter
+        yield syncs
+
+        feed = CounterMetricFamily("change_feed_events", "Change feed events", labels=["event"])
+        for name, value in changes.stats.items():
+            feed.add_metric([name], value)
+        yield feed
+        yield GaugeMetricFamily("change_feed_streams", "Open change feed streams", value=changes.snapshot()["streams"])
+
+        token_cache = CounterMetricFamily("token_verifications", "JWT verifications", labels=["result"])
+        for name, value in tokens.stats.items():
+            token_cache.add_metric([name], value)
+        yield token_cache
+
+
+def render() -> bytes:
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        # Кілька воркерів uvicorn: метрики агрегуються з файлів усіх процесів
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry)
+    return generate_latest(REGISTRY)
+
+
+REGISTRY.register(StatsCollector())
@@ -0,0 +1,19 @@
+import base64
+import json
+
+
+def encode_cursor(last_id: int) -> str:
+    raw = json.dumps({"id": last_id}, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> int:
+    padded = cursor + "=" * (-len(cursor) % 4)
+    try:
+        last_id = json.loads(base64.urlsafe_b64decode(padded))["id"]
+    except (ValueError, KeyError, TypeError):
+        raise ValueError("Invalid cursor")
+    # Лише ціле в межах integer-колонки id: 1e400, "1" чи 10**30 - підроблений курсор
+    if type(last_id) is not int or not 0 <= last_id < 2**31:
+        raise ValueError("Invalid cursor")
+    return last_id
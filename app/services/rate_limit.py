@@ -0,0 +1,221 @@
+import asyncio
+import ipaddress
+import logging
+import math
+import time
+
+from fastapi import Depends, HTTPException, Request, status
+
+from app.config import get_redis, settings
+from app.database import schemas
+from app.services.auth import get_current_user
+from app.services.cache import LRUCache
+
+logger = logging.getLogger(__name__)
+
+# Ковзне вікно з двох фіксованих лічильників (поточне + зважене попереднє).
+# Додає hits до поточного вікна і повертає оцінку кількості запитів за останні period секунд.
+SLIDING_WINDOW_SCRIPT = """
+local now = tonumber(ARGV[1])
+local period = tonumber(ARGV[2])
+local hits = tonumber(ARGV[3])
+local window = math.floor(now / period)
+local current_key = KEYS[1] .. ":" .. window
+local current = tonumber(redis.call("GET", current_key) or "0")
+if hits > 0 then
+    current = redis.call("INCRBY", current_key, hits)
+    redis.call("EXPIRE", current_key, period * 2)
+end
+local previous = tonumber(redis.call("GET", KEYS[1] .. ":" .. (window - 1)) or "0")
+local weight = 1 - (now % period) / period
+return math.floor(previous * weight + current)
+"""
+
+stats = {"allowed": 0, "denied_local": 0, "denied_global": 0, "denied_unavailable": 0, "syncs": 0, "sync_errors": 0}
+
+
+class _State:
+    """Стан ключа в цьому воркері: локальне відро токенів і останній відомий глобальний лічильник."""
+
+    __slots__ = ("key", "period", "tokens", "refilled_at", "remote", "pending", "synced_at")
+
+    def __init__(self, key: str, limit: int, period: int):
+        self.key = key
+        self.period = period
+        self.tokens = float(limit)
+        self.refilled_at = time.monotonic()
+        self.remote = 0
+        self.pending = 0
+        self.synced_at = None
+
+
+_states = LRUCache(settings.rate_limit_max_keys, ttl=max((period for _, period in settings.rate_limits.values()), default=60) * 2)
+_script = None
+_flusher = None
+# None - Redis ще не перевірявся, False - остання синхронізація впала
+_redis_ok = None
+
+
+def _take_token(state: _State, limit: int, period: int) -> bool:
+    now = time.monotonic()
+    state.tokens = min(limit, state.tokens + (now - state.refilled_at) * limit / period)
+    state.refilled_at = now
+    if state.tokens < 1:
+        return False
+    state.tokens -= 1
+    return True
+
+
+async def _sync(states):
+    """Одним pipeline відправляє накопичені хіти всіх ключів і оновлює глобальні лічильники."""
+    global _script, _redis_ok
+    now = time.time()
+    pushed = [state.pending for state in states]
+    try:
+        redis = get_redis()
+        if _script is None:
+            _script = redis.register_script(SLIDING_WINDOW_SCRIPT)
+        pipe = redis.pipeline(transaction=False)
+        for state, hits in zip(states, pushed):
+            # Script, викликаний з pipeline, сам завантажується (SCRIPT LOAD) перед execute
+            await _script(keys=[state.key], args=[now, state.period, hits], client=pipe)
+        totals = await pipe.execute()
+    except Exception as e:
+        stats["sync_errors"] += 1
+        # Не повторюємо синхронізацію на кожному запиті: наступна спроба - у flusher
+        for state in states:
+            state.synced_at = time.monotonic()
+        if _redis_ok is not False:
+            logger.warning("Rate limiter: Redis unavailable (%s), failing %s", e, "open" if settings.rate_limit_fail_open else "closed")
+        _redis_ok = False
+        return
+
+    _redis_ok = True
+    stats["syncs"] += 1
+    synced_at = time.monotonic()
+    for state, sent, total in zip(states, pushed, totals):
+        # Хіти, що прийшли під час await, лишаються в pending до наступної синхронізації
+        state.pending -= sent
+        state.remote = int(total)
+        state.synced_at = synced_at
+
+
+def _dirty():
+    return [state for state in _states.values() if state.pending]
+
+
+async def _flush_loop():
+    while True:
+        await asyncio.sleep(settings.rate_limit_sync_interval)
+        states = _dirty()
+        if states:
+            await _sync(states)
+
+
+async def start():
+    global _flusher
+    if _flusher is None:
+        _flusher = asyncio.create_task(_flush_loop())
+
+
+async def stop():
+    global _flusher
+    if _flusher is not None:
+        _flusher.cancel()
+        await asyncio.gather(_flusher, return_exceptions=True)
+        _flusher = None
+    states = _dirty()
+    if states:
+        await _sync(states)
+
+
+def _too_many(retry_after: float):
+    return HTTPException(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        detail="Too many requests",
+        headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+    )
+
+
+async def hit(policy: str, principal: str):
+    """
+    Перевіряє і рахує запит. Локальне відро відсікає сплески без Redis; глобальний ліміт
+    звіряється з лічильником, який фоновий flusher синхронізує пачками раз на RATE_LIMIT_SYNC_INTERVAL.
+    Ключ, який у цьому воркері ще не синхронізувався або мовчав довше за вікно, звіряється одразу.
+    """
+    limit, period = settings.rate_limits[policy]
+    key = f"ratelimit:{policy}:{principal}"
+    state = _states.get(key)
+    if state is None:
+        state = _State(key, limit, period)
+        _states.set(key, state)
+
+    if not _take_token(state, limit, period):
+        stats["denied_local"] += 1
+        raise _too_many((1 - state.tokens) * period / limit)
+
+    since_sync = None if state.synced_at is None else time.monotonic() - state.synced_at
+    # Після збою Redis повторюємо спробу не частіше за інтервал синхронізації
+    if since_sync is None or since_sync > period or (_redis_ok is False and since_sync > settings.rate_limit_sync_interval):
+        await _sync([state])
+
+    if _redis_ok is False and not settings.rate_limit_fail_open:
+        stats["denied_unavailable"] += 1
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Rate limiter unavailable")
+
+    if state.remote + state.pending >= limit:
+        stats["denied_global"] += 1
+        raise _too_many(period - (time.time() % period))
+
+    state.pending += 1
+    stats["allowed"] += 1
+
+
+_trusted_proxies = [ipaddress.ip_network(network) for network in settings.trusted_proxies]
+
+
+def _is_trusted(address: str) -> bool:
+    try:
+        ip = ipaddress.ip_address(address)
+    except ValueError:
+        return False
+    return any(ip in network for network in _trusted_proxies)
+
+
+def _client_ip(request: Request) -> str:
+    """
+    IP клієнта для лімітів. За балансувальником TCP-адреса - це сам балансувальник, і всі користувачі
+    ділили б одне відро. Тому від довірених проксі беремо X-Forwarded-For: справа наліво, перша адреса,
+    що не належить довіреним проксі (ліві значення клієнт може підробити).
+    """
+    host = request.client.host if request.client else "unknown"
+    if not _is_trusted(host):
+        return host
+    forwarded = [item.strip() for item in ",".join(request.headers.getlist("x-forwarded-for")).split(",") if item.strip()]
+    for address in reversed(forwarded):
+        if not _is_trusted(address):
+            return address
+    return forwarded[0] if forwarded else host
+
+
+def limit_by_ip(policy: str):
+    """Залежність для анонімних ендпоінтів (login, signup): ключ - IP клієнта."""
+    async def dependency(request: Request):
+        await hit(policy, _client_ip(request))
+    return dependency
+
+
+def limit_by_user(policy: str):
+    """Залежність для автентифікованих ендпоінтів: ключ - id користувача."""
+    async def dependency(current_user: schemas.UserResponse = Depends(get_current_user)):
+        await hit(policy, str(current_user.id))
+    return dependency
+
+
+def snapshot():
+    return {
+        **stats,
+        "keys": len(_states),
+        "redis": {None: "unknown", True: "ok", False: "unavailable"}[_redis_ok],
+        "fail_open": settings.rate_limit_fail_open,
+    }
@@ -0,0 +1,80 @@
+import hashlib
+import logging
+from urllib.parse import urlencode
+
+from app.config import get_redis, settings
+from app.services.cache import LRUCache
+
+logger = logging.getLogger(__name__)
+
+# L1 у пам'яті воркера; генерація входить у ключ, тож застарілі записи просто стають недосяжними
+_local = LRUCache(settings.response_cache_l1_size, settings.response_cache_l1_ttl)
+
+stats = {"l1_hits": 0, "l2_hits": 0, "misses": 0, "invalidations": 0, "errors": 0}
+
+
+def _generation_key(user_id: int) -> str:
+    return f"respcache:gen:{user_id}"
+
+
+async def make_key(user_id: int, endpoint: str, params: dict):
+    """Ключ (користувач, генерація, ендпоінт, нормалізовані параметри); None - кеш недоступний."""
+    if not settings.response_cache_enabled:
+        return None
+    try:
+        generation = int(await get_redis().get(_generation_key(user_id)) or 0)
+    except Exception as e:
+        stats["errors"] += 1
+        logger.warning("Response cache: Redis unavailable: %s", e)
+        return None
+
+    normalized = urlencode(sorted((name, str(value)) for name, value in params.items() if value is not None))
+    digest = hashlib.sha1(normalized.encode()).hexdigest()
+    return f"respcache:{user_id}:{generation}:{endpoint}:{digest}"
+
+
+async def get(key: str):
+    entry = _local.get(key)
+    if entry is not None:
+        stats["l1_hits"] += 1
+        return entry
+
+    try:
+        raw = await get_redis().get(key)
+    except Exception as e:
+        stats["errors"] += 1
+        logger.warning("Response cache: Redis unavailable: %s", e)
+        raw = None
+    if raw is None:
+        stats["misses"] += 1
+        return None
+
+    stats["l2_hits"] += 1
+    etag, body = raw.split(b"\n", 1)
+    entry = (etag.decode() or None, body)
+    _local.set(key, entry)
+    return entry
+
+
+async def set(key: str, etag: str, body: bytes):
+    _local.set(key, (etag, body))
+    try:
+        await get_redis().set(key, (etag or "").encode() + b"\n" + body, ex=settings.response_cache_ttl)
+    except Exception as e:
+        stats["errors"] += 1
+        logger.warning("Response cache: Redis unavailable: %s", e)
+
+
+async def invalidate_user(user_id: int):
+    if not settings.response_cache_enabled:
+        return
+    stats["invalidations"] += 1
+    try:
+        await get_redis().incr(_generation_key(user_id))
+    except Exception as e:
+        stats["errors"] += 1
+        logger.warning("Response cache: Redis unavailable: %s", e)
+
+
+def snapshot():
+    return {**stats, "l1_entries": len(_local)}
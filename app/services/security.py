@@ -1,9 +1,66 @@
-from passlib.context import CryptContext
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+from fastapi import HTTPException, status
 
-def hash_password(password: str) -> str:
-    return pwd_context.hash(password)
+from app.config import settings
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
\ No newline at end of file
+
+@lru_cache
+def get_pwd_context(rounds: int):
+    # passlib і bcrypt вантажаться при першому хешуванні, а не під час старту застосунку
+    from passlib.context import CryptContext
+
+    return CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=rounds)
+
+# rounds передається аргументом: функції виконуються у процесах пулу, які не мають перечитувати налаштування
+def hash_password(password: str, rounds: int) -> str:
+    return get_pwd_context(rounds).hash(password)
+
+def verify_password(plain_password: str, hashed_password: str, rounds: int) -> bool:
+    return get_pwd_context(rounds).verify(plain_password, hashed_password)
+
+def password_needs_update(hashed_password: str) -> bool:
+    return get_pwd_context(settings.bcrypt_rounds).needs_update(hashed_password)
+
+
+_executor = None
+_pending = 0
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(max_workers=settings.bcrypt_workers)
+    return _executor
+
+async def _run_in_pool(operation: str, func, *args):
+    """Виконує bcrypt у пулі процесів; якщо черга переповнена, одразу відповідає 503."""
+    # Ліниво: модуль імпортують і процеси пулу, їм prometheus_client не потрібен
+    from app.services.instrumentation import timed
+
+    global _pending
+    if _pending >= settings.bcrypt_max_pending:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Server is busy, try again later",
+            headers={"Retry-After": "1"},
+        )
+    _pending += 1
+    try:
+        with timed(operation):
+            return await asyncio.get_running_loop().run_in_executor(_get_executor(), func, *args)
+    finally:
+        _pending -= 1
+
+async def hash_password_async(password: str) -> str:
+    return await _run_in_pool("bcrypt_hash", hash_password, password, settings.bcrypt_rounds)
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    return await _run_in_pool("bcrypt_verify", verify_password, plain_password, hashed_password, settings.bcrypt_rounds)
+
+def shutdown_executor():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
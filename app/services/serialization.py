@@ -0,0 +1,49 @@
+import orjson
+from pydantic import TypeAdapter
+
+from app.database.schemas import ContactResponse
+
+_contacts = TypeAdapter(list[ContactResponse])
+_contact_fields = tuple(ContactResponse.model_fields)
+
+
+def _construct(contacts):
+    return [
+        ContactResponse.model_construct(**{name: getattr(contact, name) for name in _contact_fields})
+        for contact in contacts
+    ]
+
+
+def dump_contacts(contacts) -> bytes:
+    """
+    ORM-об'єкти -> JSON. Дані з БД уже пройшли валідацію на запис, тож моделі збираються
+    через model_construct (повторна перевірка EmailStr коштує більше за саму серіалізацію),
+    а байти дає pydantic-core за один прохід, без jsonable_encoder.
+    """
+    return _contacts.dump_json(_construct(contacts))
+
+
+def contact_dicts(contacts) -> list[dict]:
+    """Те саме, що dump_contacts, але JSON-сумісні dict-и - для вкладення в інші повідомлення."""
+    return _contacts.dump_python(_construct(contacts), mode="json")
+
+
+def dump_rows(rows, **extra) -> bytes:
+    """
+    Row-кортежі з select(колонки): типи вже задані БД, тож валідація не потрібна.
+    OPT_UTC_Z дає той самий формат дат ("...Z"), що й pydantic.
+    """
+    return orjson.dumps({"items": [row._asdict() for row in rows], **extra}, option=orjson.OPT_UTC_Z)
+
+
+def dump_changes(rows, **extra) -> bytes:
+    """Сторінка /contacts/sync: живі рядки йдуть в items, від tombstone-ів лишається тільки id у deleted."""
+    items, deleted = [], []
+    for row in rows:
+        if row.deleted_at is not None:
+            deleted.append(row.id)
+            continue
+        item = row._asdict()
+        del item["version"], item["deleted_at"]
+        items.append(item)
+    return orjson.dumps({"items": items, "deleted": deleted, **extra}, option=orjson.OPT_UTC_Z)
@@ -0,0 +1,126 @@
+import hashlib
+import logging
+import secrets
+import time
+from datetime import datetime, timedelta
+from functools import lru_cache
+
+from jose import JWTError, jwk, jwt
+
+from app.config import settings
+from app.services.cache import LRUCache
+from app.services.instrumentation import timed
+
+logger = logging.getLogger(__name__)
+
+ACCESS = "access"
+EMAIL_VERIFY = "email_verify"
+
+stats = {"cache_hits": 0, "cache_misses": 0, "rejected": 0}
+
+# Перевірені claims за sha256 токена; живуть не довше за exp самого токена
+_claims = LRUCache(settings.token_cache_size, settings.token_cache_max_ttl)
+
+
+def _load_keys():
+    """
+    JWT_KEYS - "kid:значення,...": для HS* значення - секрет, для RS*/ES* - шлях до PEM.
+    Підписує ключ JWT_ACTIVE_KID, перевіряються всі, тож старий ключ лишають у списку,
+    доки не спливуть випущені ним токени.
+    """
+    keys = {}
+    for item in filter(None, (part.strip() for part in settings.jwt_keys.split(","))):
+        kid, value = item.split(":", 1)
+        if not settings.jwt_algorithm.startswith("HS"):
+            with open(value) as f:
+                value = f.read()
+        keys[kid] = value
+
+    if not keys:
+        secret = settings.secret_key
+        if not secret:
+            # Без налаштованого ключа краще токени, що живуть до рестарту, ніж відомий усім секрет
+            logger.warning("SECRET_KEY is not set, using a random key: tokens will not survive a restart")
+            secret = secrets.token_urlsafe(32)
+        keys["default"] = secret
+
+    active = settings.jwt_active_kid or next(iter(keys))
+    if active not in keys:
+        raise ValueError(f"JWT_ACTIVE_KID {active!r} is not in JWT_KEYS")
+    return keys, active
+
+
+def _public(key: str):
+    if settings.jwt_algorithm.startswith("HS"):
+        return key
+    # Асиметричні ключі: для перевірки достатньо публічної частини, приватна потрібна лише активному kid
+    key = jwk.construct(key, settings.jwt_algorithm)
+    return key if key.is_public() else key.public_key()
+
+
+@lru_cache
+def load_keys():
+    """
+    (ключі підпису, активний kid, ключі перевірки). Читаються при першому використанні, а не під час
+    імпорту; lifespan викликає це на старті, щоб помилка в JWT_KEYS зупиняла запуск одразу.
+    """
+    keys, active_kid = _load_keys()
+    return keys, active_kid, {kid: _public(key) for kid, key in keys.items()}
+
+
+def create_token(subject: str, token_type: str, expires_delta: timedelta) -> str:
+    keys, active_kid, _ = load_keys()
+    claims = {"sub": subject, "typ": token_type, "exp": datetime.utcnow() + expires_delta}
+    return jwt.encode(claims, keys[active_kid], algorithm=settings.jwt_algorithm, headers={"kid": active_kid})
+
+
+def _decode(token: str) -> dict:
+    _, active_kid, verification_keys = load_keys()
+    kid = jwt.get_unverified_header(token).get("kid") or active_kid
+    key = verification_keys.get(kid)
+    if key is None:
+        raise JWTError("Unknown signing key")
+    with timed("jwt_decode"):
+        return jwt.decode(token, key, algorithms=[settings.jwt_algorithm])
+
+
+def verify_token(token: str, token_type: str = ACCESS) -> dict:
+    """
+    Повертає перевірені claims або кидає JWTError. Повторні запити з тим самим токеном
+    не платять за перевірку підпису: claims беруться з кешу до exp.
+    """
+    cache_key = hashlib.sha256(token.encode()).digest()
+    claims = _claims.get(cache_key)
+    if claims is not None and claims["exp"] > time.time():
+        stats["cache_hits"] += 1
+    else:
+        stats["cache_misses"] += 1
+        try:
+            claims = _decode(token)
+        except JWTError:
+            stats["rejected"] += 1
+            raise
+        ttl = claims.get("exp", 0) - time.time()
+        if ttl > 0:
+            _claims.set(cache_key, claims, ttl=min(ttl, settings.token_cache_max_ttl))
+
+    # Токени без typ випущені до появи цього поля; тип перевіряється лише коли він є
+    if claims.get("typ", token_type) != token_type:
+        raise JWTError("Wrong token type")
+    if not claims.get("sub"):
+        raise JWTError("Token has no subject")
+    return claims
+
+
+def jwks() -> dict:
+    """Публічні ключі для сторонніх сервісів; для HS* ключі секретні й не публікуються."""
+    if settings.jwt_algorithm.startswith("HS"):
+        return {"keys": []}
+    return {"keys": [
+        {**key.to_dict(), "kid": kid, "use": "sig", "alg": settings.jwt_algorithm}
+        for kid, key in load_keys()[2].items()
+    ]}
+
+
+def snapshot():
+    return {**stats, "cached": len(_claims), "active_kid": load_keys()[1], "algorithm": settings.jwt_algorithm}
@@ -0,0 +1,50 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta
+
+from app.config import settings
+from app.database import crud
+from app.database.db import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+_task = None
+
+
+async def compact() -> int:
+    """Видаляє tombstone-и, старші за contacts_tombstone_ttl, пачками по короткій транзакції."""
+    older_than = datetime.utcnow() - timedelta(seconds=settings.contacts_tombstone_ttl)
+    total = 0
+    async with SessionLocal() as db:
+        while True:
+            purged = await crud.purge_tombstones(db, older_than, settings.contacts_compaction_batch)
+            total += purged
+            if purged < settings.contacts_compaction_batch:
+                return total
+
+
+async def _loop():
+    # Працює в кожному воркері; паралельні проходи не заважають один одному завдяки SKIP LOCKED
+    while True:
+        await asyncio.sleep(settings.contacts_compaction_interval)
+        try:
+            purged = await compact()
+        except Exception:
+            logger.exception("Tombstone compaction failed")
+            continue
+        if purged:
+            logger.info("Contact tombstones purged", extra={"count": purged})
+
+
+async def start():
+    global _task
+    if _task is None:
+        _task = asyncio.create_task(_loop())
+
+
+async def stop():
+    global _task
+    if _task is not None:
+        _task.cancel()
+        await asyncio.gather(_task, return_exceptions=True)
+        _task = None
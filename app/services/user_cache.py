@@ -0,0 +1,52 @@
+import logging
+
+from app.config import get_redis, settings
+from app.database.schemas import UserResponse
+from app.services.cache import LRUCache
+
+logger = logging.getLogger(__name__)
+
+# L1 живе в кожному воркері окремо, тому TTL короткий: інвалідація в інших воркерах доходить лише через Redis
+_local = LRUCache(settings.user_cache_size, settings.user_cache_ttl)
+
+
+def _redis_key(sub: str) -> str:
+    return f"user:principal:{sub}"
+
+
+async def get(sub: str):
+    user = _local.get(sub)
+    if user is not None or not settings.user_cache_redis:
+        return user
+
+    try:
+        raw = await get_redis().get(_redis_key(sub))
+    except Exception as e:
+        logger.warning("User cache: Redis unavailable: %s", e)
+        return None
+    if raw is None:
+        return None
+
+    user = UserResponse.model_validate_json(raw)
+    _local.set(sub, user)
+    return user
+
+
+async def set(sub: str, user: UserResponse):
+    _local.set(sub, user)
+    if not settings.user_cache_redis:
+        return
+    try:
+        await get_redis().set(_redis_key(sub), user.model_dump_json(), ex=settings.user_cache_redis_ttl)
+    except Exception as e:
+        logger.warning("User cache: Redis unavailable: %s", e)
+
+
+async def invalidate(sub: str):
+    _local.delete(sub)
+    if not settings.user_cache_redis:
+        return
+    try:
+        await get_redis().delete(_redis_key(sub))
+    except Exception as e:
+        logger.warning("User cache: Redis unavailable: %s", e)
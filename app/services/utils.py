@@ -1,34 +1,83 @@
+import calendar
+import logging
+import re
 from datetime import date, timedelta
-from sqlalchemy.orm import Session
+from sqlalchemy import select, or_, literal_column
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.sql import func
 from app.database.models import Contact
 
-def search_contacts(db: Session, name: str = None, email: str = None):
-    query = db.query(Contact)
-    
-    if name:
-        query = query.filter(
-            (Contact.first_name.ilike(f"%{name}%")) | (Contact.last_name.ilike(f"%{name}%"))
-        )
-    
+logger = logging.getLogger(__name__)
+
+def _prefix_tsquery(text: str) -> str:
+    # "john sm" -> "john:* & sm:*"; у tsquery потрапляють лише літери та цифри
+    return " & ".join(f"{token}:*" for token in re.findall(r"\w+", text.lower()))
+
+async def search_contacts(db: AsyncSession, user_id: int, q: str = None, email: str = None, limit: int = 20, name: str = None):
+    stmt = select(Contact).where(Contact.user_id == user_id, Contact.deleted_at.is_(None))
+
     if email:
-        query = query.filter(Contact.email == email)
-    
-    return query.all()
+        stmt = stmt.where(Contact.email == email)
+
+    if name:
+        # name шукає лише в імені та прізвищі, як і раніше; по всіх полях шукає q
+        stmt = stmt.where(or_(
+            Contact.first_name.icontains(name, autoescape=True),
+            Contact.last_name.icontains(name, autoescape=True),
+        ))
 
-def get_upcoming_birthdays(db: Session, user_id: int):
+    if not q or not q.strip():
+        return (await db.scalars(stmt.order_by(Contact.id).limit(limit))).all()
+
+    term = q.strip().lower()
+    # Нечіткий збіг по триграмах (search_text %> term використовує GIN-індекс gin_trgm_ops)
+    conditions = [Contact.search_text.op("%>")(term)]
+    rank = func.word_similarity(term, Contact.search_text)
+
+    prefix = _prefix_tsquery(term)
+    if prefix:
+        tsquery = func.to_tsquery(literal_column("'simple'::regconfig"), prefix)
+        conditions.append(Contact.search_vector.op("@@")(tsquery))
+        rank = rank + func.ts_rank(Contact.search_vector, tsquery)
+
+    stmt = stmt.where(or_(*conditions)).order_by(rank.desc(), Contact.id).limit(limit)
+    return (await db.scalars(stmt)).all()
+
+def birthday_day_of_year(birthday: date):
+    # Рахуємо у високосному 2000 році: 29 лютого завжди 60, 1 березня завжди 61
+    if birthday is None:
+        return None
+    return date(2000, birthday.month, birthday.day).timetuple().tm_yday
+
+async def get_upcoming_birthdays(db: AsyncSession, user_id: int, days: int = 7, limit: int = 50, offset: int = 0):
     today = date.today()
-    next_week = today + timedelta(days=7)
+    end_date = today + timedelta(days=days)
+    start = birthday_day_of_year(today)
+    end = birthday_day_of_year(end_date)
+
+    # У невисокосний рік іменинники 29 лютого святкують 28-го
+    if end == 59 and not calendar.isleap(end_date.year):
+        end = 60
 
-    print(f"🔎 Сьогодні: {today}")
-    print(f"📅 Шукаємо дні народження з {today.day}-{today.month} до {next_week.day}-{next_week.month} (ІГНОРУЄМО РІК)")
+    if days >= 365:
+        condition = Contact.birthday_doy.is_not(None)
+    elif start <= end:
+        condition = Contact.birthday_doy.between(start, end)
+    else:
+        # Вікно переходить через Новий рік: два діапазони по тому ж індексу
+        condition = or_(Contact.birthday_doy >= start, Contact.birthday_doy <= end)
 
-    contacts = db.query(Contact).filter(
-        Contact.user_id == user_id, 
-        ((func.extract('month', Contact.birthday) == today.month) & (func.extract('day', Contact.birthday) >= today.day)) |
-        ((func.extract('month', Contact.birthday) == next_week.month) & (func.extract('day', Contact.birthday) <= next_week.day))
-    ).all()
+    stmt = (
+        select(Contact)
+        .where(Contact.user_id == user_id, Contact.deleted_at.is_(None), condition)
+        .order_by((Contact.birthday_doy - start + 366) % 366, Contact.id)
+        .limit(limit)
+        .offset(offset)
+    )
+    contacts = (await db.scalars(stmt)).all()
 
-    print(f"👀 Знайдено контактів: {len(contacts)}")
-    
+    logger.info(
+        "upcoming birthdays lookup",
+        extra={"user_id": user_id, "start_doy": start, "end_doy": end, "days": days, "found": len(contacts)},
+    )
     return contacts
@@ -0,0 +1,345 @@
+"""
+Навантажувальний тест Contacts API.
+
+1. Детерміновано заповнює базу: N користувачів x M контактів (той самий --seed
+   дає ті самі дані), пароль у всіх однаковий.
+2. Піднімає застосунок через uvicorn (або б'є в --base-url уже запущеного).
+3. Запускає --concurrency віртуальних користувачів на --duration секунд; кожен
+   виконує операції у пропорціях обраного сценарію (--mix).
+4. Друкує RPS і p50/p95/p99 по кожному ендпоінту та зберігає результат у JSON.
+   З --compare порівнює p95 з попереднім запуском і завершується з кодом 1,
+   якщо якийсь ендпоінт повільнішав більше ніж на --threshold відсотків.
+
+Потрібні мігрована база Postgres (DATABASE_URL) і Redis (REDIS_URL): схема
+використовує tsvector, pg_trgm і ON CONFLICT, тож SQLite не підходить.
+Для власного uvicorn ліміти запитів знімаються; для --base-url подбайте про
+RATE_LIMITS самі, інакше login/signup швидко отримають 429.
+
+Запуск:
+    python -m benchmarks.load_test --users 20 --contacts 500 --concurrency 32 --duration 60 \\
+        --save benchmarks/results/baseline.json
+    python -m benchmarks.load_test ... --save benchmarks/results/current.json \\
+        --compare benchmarks/results/baseline.json
+"""
+import argparse
+import asyncio
+import io
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import time
+import uuid
+from datetime import date, datetime, timezone
+
+import httpx
+from PIL import Image
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
+
+from app.config import settings
+from app.database.db import SessionLocal, dispose_engine, init_engine
+from app.database.models import Contact, User
+from app.services.security import hash_password
+from app.services.utils import birthday_day_of_year
+
+PASSWORD = "load-test-password"
+FIRST_NAMES = ["Ivan", "Anna", "Oleksandr", "Olena", "Petro", "Maria", "Taras", "Iryna", "Andrii", "Sofiia"]
+LAST_NAMES = ["Kovalenko", "Shevchenko", "Bondarenko", "Tkachenko", "Kravchenko", "Melnyk", "Boiko", "Moroz"]
+SEARCH_TERMS = ["iva", "anna", "kov", "shev", "olen", "melnik", "example", "050"]
+
+# Ваги операцій у сценаріях
+MIXES = {
+    "default": {
+        "login": 2, "list": 30, "search": 20, "birthdays": 10,
+        "get": 10, "create": 10, "update": 10, "delete": 5, "avatar": 1,
+    },
+    "read_heavy": {"login": 1, "list": 45, "search": 25, "birthdays": 15, "get": 14},
+    "write_heavy": {"login": 1, "list": 15, "create": 35, "update": 30, "delete": 15, "avatar": 4},
+}
+
+
+def user_email(index: int) -> str:
+    return f"load-{index}@example.com"
+
+
+def make_contact(rnd: random.Random, user_index: int, number: int) -> dict:
+    birthday = date(rnd.randint(1950, 2010), rnd.randint(1, 12), rnd.randint(1, 28))
+    return {
+        "first_name": rnd.choice(FIRST_NAMES),
+        "last_name": rnd.choice(LAST_NAMES),
+        "email": f"contact-{user_index}-{number}@example.com",
+        "phone": f"+380{rnd.randint(500000000, 999999999)}",
+        "birthday": birthday,
+        "birthday_doy": birthday_day_of_year(birthday),
+        "extra_info": rnd.choice([None, "friend", "work", "family", "vip"]),
+    }
+
+
+async def seed(users: int, contacts: int, seed_value: int):
+    password_hash = hash_password(PASSWORD, settings.bcrypt_rounds)
+    async with SessionLocal() as db:
+        for index in range(users):
+            await db.execute(
+                insert(User)
+                .values(username=f"load-{index}", email=user_email(index), password_hash=password_hash, is_verified=True)
+                .on_conflict_do_nothing(index_elements=[User.email])
+            )
+        await db.commit()
+
+        user_ids = dict((await db.execute(
+            select(User.email, User.id).where(User.email.in_([user_email(i) for i in range(users)]))
+        )).all())
+        for index in range(users):
+            rnd = random.Random(seed_value * 100003 + index)
+            rows = [make_contact(rnd, index, number) for number in range(contacts)]
+            for start in range(0, len(rows), 1000):
+                chunk = [{**row, "user_id": user_ids[user_email(index)]} for row in rows[start:start + 1000]]
+                await db.execute(insert(Contact).values(chunk).on_conflict_do_nothing(
+                    index_elements=[Contact.user_id, Contact.email], index_where=Contact.deleted_at.is_(None),
+                ))
+            await db.commit()
+
+
+def png() -> bytes:
+    buffer = io.BytesIO()
+    Image.new("RGB", (256, 256), (60, 140, 200)).save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+class VirtualUser:
+    def __init__(self, client: httpx.AsyncClient, index: int, rnd: random.Random, results: dict, avatar: bytes):
+        self.client = client
+        self.email = user_email(index)
+        self.rnd = rnd
+        self.results = results
+        self.avatar = avatar
+        self.ids = []
+        self.created = []
+        self.prefix = uuid.uuid4().hex[:8]
+
+    async def request(self, name: str, method: str, url: str, **kwargs):
+        start = time.perf_counter()
+        try:
+            response = await self.client.request(method, url, **kwargs)
+            ok = response.status_code < 400 or response.status_code == 404
+        except httpx.HTTPError:
+            response, ok = None, False
+        entry = self.results.setdefault(name, {"latencies": [], "errors": 0})
+        entry["latencies"].append(time.perf_counter() - start)
+        if not ok:
+            entry["errors"] += 1
+        return response
+
+    async def login(self):
+        response = await self.request("login", "POST", "/auth/login", data={"username": self.email, "password": PASSWORD})
+        if response is not None and response.status_code == 200:
+            self.client.headers["Authorization"] = f"Bearer {response.json()['access_token']}"
+
+    async def list(self):
+        response = await self.request("list", "GET", "/contacts/", params={"limit": 50})
+        if response is not None and response.status_code == 200:
+            self.ids = [item["id"] for item in response.json()["items"]] or self.ids
+
+    async def search(self):
+        await self.request("search", "GET", "/contacts/search/", params={"q": self.rnd.choice(SEARCH_TERMS)})
+
+    async def birthdays(self):
+        await self.request("birthdays", "GET", "/contacts/upcoming_birthdays/", params={"days": self.rnd.choice([7, 30])})
+
+    async def get(self):
+        if not self.ids:
+            return await self.list()
+        await self.request("get", "GET", f"/contacts/{self.rnd.choice(self.ids)}")
+
+    async def create(self):
+        number = len(self.created)
+        payload = make_contact(self.rnd, 0, number)
+        payload = {
+            **payload,
+            "email": f"lt-{self.prefix}-{number}-{self.rnd.random():.6f}@example.com",
+            "birthday": payload["birthday"].isoformat(),
+        }
+        payload.pop("birthday_doy")
+        response = await self.request("create", "POST", "/contacts/", json=payload)
+        if response is not None and response.status_code == 200:
+            self.created.append(response.json()["id"])
+
+    async def update(self):
+        if not self.ids and not self.created:
+            return await self.list()
+        contact_id = self.rnd.choice(self.created or self.ids)
+        await self.request("update", "PUT", f"/contacts/{contact_id}", json={"extra_info": f"updated {self.rnd.random():.4f}"})
+
+    async def delete(self):
+        if not self.created:
+            return await self.create()
+        await self.request("delete", "DELETE", f"/contacts/{self.created.pop()}")
+
+    async def avatar_upload(self):
+        await self.request("avatar", "POST", "/auth/avatar", files={"file": ("avatar.png", self.avatar, "image/png")})
+
+    async def run(self, mix: dict, deadline: float):
+        operations = {
+            "login": self.login, "list": self.list, "search": self.search, "birthdays": self.birthdays,
+            "get": self.get, "create": self.create, "update": self.update, "delete": self.delete,
+            "avatar": self.avatar_upload,
+        }
+        names = list(mix)
+        weights = [mix[name] for name in names]
+        await self.login()
+        while time.monotonic() < deadline:
+            await operations[self.rnd.choices(names, weights)[0]]()
+
+
+def percentile(sorted_values, q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(q / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def summarize(results: dict, elapsed: float) -> dict:
+    summary = {}
+    for name, entry in sorted(results.items()):
+        latencies = sorted(entry["latencies"])
+        summary[name] = {
+            "requests": len(latencies),
+            "errors": entry["errors"],
+            "rps": round(len(latencies) / elapsed, 2),
+            "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+            "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+            "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+            "mean_ms": round(statistics.fmean(latencies) * 1000, 2) if latencies else 0.0,
+        }
+    return summary
+
+
+def print_summary(summary: dict, elapsed: float):
+    total = sum(item["requests"] for item in summary.values())
+    print(f"{total} requests in {elapsed:.1f}s ({total / elapsed:.1f} req/s)")
+    print(f"{'endpoint':<12}{'requests':>10}{'errors':>8}{'rps':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for name, item in summary.items():
+        print(f"{name:<12}{item['requests']:>10}{item['errors']:>8}{item['rps']:>10}"
+              f"{item['p50_ms']:>10}{item['p95_ms']:>10}{item['p99_ms']:>10}")
+
+
+def compare(summary: dict, baseline_path: str, threshold: float) -> bool:
+    with open(baseline_path) as f:
+        baseline = json.load(f)["endpoints"]
+    regressed = False
+    print(f"\np95 vs {baseline_path}:")
+    for name, item in summary.items():
+        before = baseline.get(name)
+        if not before or not before["p95_ms"]:
+            continue
+        change = (item["p95_ms"] - before["p95_ms"]) / before["p95_ms"] * 100
+        flag = change > threshold
+        regressed |= flag
+        print(f"{'REGRESSED' if flag else 'ok':<10}{name:<12}{before['p95_ms']:>10} -> {item['p95_ms']:<10}({change:+.1f}%)")
+    return regressed
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def wait_ready(base_url: str, timeout: float = 30):
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient(base_url=base_url) as client:
+        while time.monotonic() < deadline:
+            try:
+                if (await client.get("/")).status_code == 200:
+                    return
+            except httpx.HTTPError:
+                pass
+            await asyncio.sleep(0.2)
+    raise RuntimeError(f"App at {base_url} did not start in {timeout}s")
+
+
+def start_server(port: int, workers: int):
+    env = {**os.environ, "RATE_LIMITS": "login=1000000/60,signup=1000000/60,me=1000000/60"}
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--workers", str(workers), "--log-level", "warning"],
+        env=env,
+    )
+
+
+async def load(args):
+    results = {}
+    avatar = png()
+    deadline = time.monotonic() + args.duration
+    # Окремий клієнт (і keep-alive з'єднання) на кожного віртуального користувача: у кожного свій токен
+    clients = [httpx.AsyncClient(base_url=args.base_url, timeout=30) for _ in range(args.concurrency)]
+    try:
+        start = time.perf_counter()
+        await asyncio.gather(*[
+            VirtualUser(client, i % args.users, random.Random(args.seed + i), results, avatar).run(MIXES[args.mix], deadline)
+            for i, client in enumerate(clients)
+        ])
+        elapsed = time.perf_counter() - start
+    finally:
+        await asyncio.gather(*[client.aclose() for client in clients])
+    return summarize(results, elapsed), elapsed
+
+
+async def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--contacts", type=int, default=500, help="contacts per user")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--mix", choices=sorted(MIXES), default="default")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=30)
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers when the app is started here")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--base-url", help="use an already running app instead of starting uvicorn")
+    parser.add_argument("--skip-seed", action="store_true")
+    parser.add_argument("--save", help="write results as JSON")
+    parser.add_argument("--compare", help="baseline JSON to compare p95 against")
+    parser.add_argument("--threshold", type=float, default=10, help="allowed p95 regression, percent")
+    args = parser.parse_args()
+
+    if not args.skip_seed:
+        print(f"Seeding {args.users} users x {args.contacts} contacts...")
+        init_engine()
+        await seed(args.users, args.contacts, args.seed)
+        await dispose_engine()
+
+    server = None
+    if not args.base_url:
+        args.base_url = f"http://127.0.0.1:{args.port}"
+        server = start_server(args.port, args.workers)
+    try:
+        await wait_ready(args.base_url)
+        summary, elapsed = await load(args)
+    finally:
+        if server:
+            server.terminate()
+            server.wait()
+
+    print_summary(summary, elapsed)
+    if args.save:
+        os.makedirs(os.path.dirname(args.save) or ".", exist_ok=True)
+        with open(args.save, "w") as f:
+            json.dump({
+                "commit": git_commit(),
+                "created_at": datetime.now(timezone.utc).isoformat(),
+                "params": {name: value for name, value in vars(args).items() if name not in ("save", "compare")},
+                "duration_s": round(elapsed, 2),
+                "endpoints": summary,
+            }, f, indent=2)
+        print(f"Saved to {args.save}")
+
+    if args.compare and compare(summary, args.compare, args.threshold):
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
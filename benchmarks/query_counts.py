@@ -0,0 +1,122 @@
+"""
+Регресійна перевірка кількості SQL-запитів на ендпоінт.
+
+Проганяє застосунок у тому ж процесі (httpx + ASGITransport, без мережі) під
+тимчасовим користувачем і рахує statement-и кожного запиту через
+app.database.query_counter. Якщо ендпоінт перевищив свій бюджет у BUDGETS,
+скрипт друкує виконаний SQL і завершується з кодом 1 - так його можна
+запускати в CI після змін у crud.
+
+Авторизація не входить у підрахунок: кеш користувача прогрівається заздалегідь.
+
+Запуск (потрібні мігрована база Postgres з DATABASE_URL і Redis з REDIS_URL):
+    EMAIL_TRANSPORT=local python -m benchmarks.query_counts
+"""
+import asyncio
+import io
+import sys
+import uuid
+
+import httpx
+from PIL import Image
+from sqlalchemy import text
+
+from app.database.db import SessionLocal
+from app.database.query_counter import count_queries
+from app.main import app
+from app.services.auth import create_verification_token
+
+# Ендпоінти запису: рівно один statement (INSERT/UPDATE/DELETE ... RETURNING).
+# Реєстрація - два: SELECT EXISTS перед bcrypt, щоб повторний email не займав пул хешування.
+BUDGETS = {
+    "POST /auth/signup": 2,
+    "GET /auth/verify/{token}": 1,
+    "POST /auth/login": 1,
+    "POST /auth/avatar": 1,
+    "POST /contacts/": 1,
+    "PUT /contacts/{id}": 1,
+    "PATCH /contacts/batch": 1,
+    "POST /contacts/batch/delete": 1,
+    "DELETE /contacts/{id}": 1,
+    "POST /contacts/import": 1,
+}
+
+
+def png() -> bytes:
+    buffer = io.BytesIO()
+    Image.new("RGB", (64, 64), (200, 120, 40)).save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+async def run(client: httpx.AsyncClient, results: dict, name: str, method: str, url: str, **kwargs):
+    with count_queries() as statements:
+        response = await client.request(method, url, **kwargs)
+    if response.status_code >= 400:
+        raise RuntimeError(f"{name}: {response.status_code} {response.text}")
+    results[name] = statements
+    return response
+
+
+async def main() -> int:
+    email = f"qc-{uuid.uuid4().hex[:8]}@example.com"
+    results = {}
+
+    # lifespan піднімає engine, rate limiter і воркери так само, як uvicorn
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        try:
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                await run(client, results, "POST /auth/signup", "POST", "/auth/signup",
+                          json={"username": email, "email": email, "password": "secret123"})
+                await run(client, results, "GET /auth/verify/{token}", "GET", f"/auth/verify/{create_verification_token(email)}")
+                login = await run(client, results, "POST /auth/login", "POST", "/auth/login",
+                                  data={"username": email, "password": "secret123"})
+                client.headers["Authorization"] = f"Bearer {login.json()['access_token']}"
+
+                # Прогрів кешу користувача, щоб get_current_user не потрапляв у підрахунок
+                await client.get("/contacts/")
+
+                await run(client, results, "POST /auth/avatar", "POST", "/auth/avatar",
+                          files={"file": ("avatar.png", png(), "image/png")})
+
+                ids = []
+                for i in range(3):
+                    created = await run(client, results, "POST /contacts/", "POST", "/contacts/", json={
+                        "first_name": "Query", "last_name": f"Count{i}", "email": f"c{i}-{email}",
+                        "phone": "+380000000000", "birthday": "1990-05-17",
+                    })
+                    ids.append(created.json()["id"])
+
+                await run(client, results, "PUT /contacts/{id}", "PUT", f"/contacts/{ids[0]}", json={"phone": "+380111111111"})
+                await run(client, results, "PATCH /contacts/batch", "PATCH", "/contacts/batch",
+                          json=[{"id": id, "extra_info": "batch"} for id in ids])
+                await run(client, results, "POST /contacts/batch/delete", "POST", "/contacts/batch/delete", json={"ids": ids[1:]})
+                await run(client, results, "DELETE /contacts/{id}", "DELETE", f"/contacts/{ids[0]}")
+
+                job = await run(client, results, "POST /contacts/import", "POST", "/contacts/import",
+                                content=f"first_name,last_name,email,phone\nQuery,Import,i-{email},+380000000000\n",
+                                headers={"Content-Type": "text/csv"})
+                # Імпорт іде у фоні - чекаємо завершення, щоб прибирання нижче не гналося з ним
+                while (await client.get(f"/contacts/import/{job.json()['id']}")).json()["status"] in ("pending", "running"):
+                    await asyncio.sleep(0.05)
+        finally:
+            async with SessionLocal() as db:
+                await db.execute(text("DELETE FROM contacts WHERE user_id IN (SELECT id FROM users WHERE email = :email)"), {"email": email})
+                await db.execute(text("DELETE FROM import_jobs WHERE user_id IN (SELECT id FROM users WHERE email = :email)"), {"email": email})
+                await db.execute(text("DELETE FROM users WHERE email = :email"), {"email": email})
+                await db.commit()
+
+    failed = False
+    for name, budget in BUDGETS.items():
+        statements = results.get(name, [])
+        ok = len(statements) <= budget
+        failed |= not ok
+        print(f"{'ok  ' if ok else 'FAIL'} {name:<32} {len(statements)} / {budget}")
+        if not ok:
+            for statement in statements:
+                print("       " + " ".join(statement.split())[:160])
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
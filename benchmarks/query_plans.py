@@ -0,0 +1,86 @@
+"""
+Перевірка планів запитів crud до таблиці contacts.
+
+Виконує реальні функції crud/utils, перехоплює згенерований SQL і проганяє
+його через EXPLAIN з enable_seqscan = off. Якщо Postgres все одно обирає
+Seq Scan по contacts, для запиту немає придатного індексу - скрипт завершується
+з кодом 1. Підходить як регресійна перевірка в CI після міграцій.
+
+Запуск (потрібна мігрована база Postgres з DATABASE_URL):
+    python -m benchmarks.query_plans
+"""
+import asyncio
+import json
+import sys
+
+from sqlalchemy import event
+
+from app.database import crud
+from app.database.db import SessionLocal, dispose_engine, init_engine
+from app.services import utils
+
+USER_ID = 1
+
+CHECKS = {
+    "get_contacts first page": lambda db: crud.get_contacts(db, USER_ID, 51),
+    "get_contacts next page": lambda db: crud.get_contacts(db, USER_ID, 51, 1000),
+    "get_contacts projection": lambda db: crud.get_contacts(db, USER_ID, 51, None, ["id", "email"]),
+    "get_contact_by_id": lambda db: crud.get_contact_by_id(db, 1, USER_ID),
+    "search_contacts": lambda db: utils.search_contacts(db, USER_ID, "ivan", None, 20),
+    "search_contacts by email": lambda db: utils.search_contacts(db, USER_ID, None, "ivan@example.com", 20),
+    "search_contacts by name": lambda db: utils.search_contacts(db, USER_ID, None, None, 20, name="ivan"),
+    "get_upcoming_birthdays": lambda db: utils.get_upcoming_birthdays(db, USER_ID, 7, 50, 0),
+    "get_contact_changes": lambda db: crud.get_contact_changes(db, USER_ID, 1000, 51),
+}
+
+
+def seq_scans(plan, relation="contacts"):
+    found = []
+    if plan.get("Node Type") == "Seq Scan" and plan.get("Relation Name") == relation:
+        found.append(plan)
+    for child in plan.get("Plans", []):
+        found.extend(seq_scans(child, relation))
+    return found
+
+
+async def explain(name, check):
+    engine = init_engine()
+    captured = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        captured.append((statement, parameters))
+
+    event.listen(engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        async with SessionLocal() as db:
+            await check(db)
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+
+    failures = []
+    async with engine.connect() as conn:
+        await conn.exec_driver_sql("SET LOCAL enable_seqscan = off")
+        for statement, parameters in captured:
+            result = await conn.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {statement}", parameters)
+            plan = result.scalar()
+            plan = json.loads(plan) if isinstance(plan, str) else plan
+            if seq_scans(plan[0]["Plan"]):
+                failures.append(statement)
+        await conn.rollback()
+    return failures
+
+
+async def main():
+    failed = False
+    for name, check in CHECKS.items():
+        failures = await explain(name, check)
+        print(f"{'FAIL' if failures else 'ok':4}  {name}")
+        for statement in failures:
+            print(f"      Seq Scan on contacts: {statement}")
+        failed = failed or bool(failures)
+    await dispose_engine()
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,94 @@
+"""
+Бенчмарк пошуку контактів на великій таблиці.
+
+Заповнює таблицю contacts N рядками (за замовчуванням 1 000 000) для окремого
+тестового користувача і міряє p50/p95/p99 для префіксних, нечітких та
+багатопольових запитів через app.services.utils.search_contacts.
+
+Запуск (потрібна мігрована база Postgres з DATABASE_URL):
+    python -m benchmarks.search_benchmark --rows 1000000 --queries 200
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import time
+
+from sqlalchemy import text
+
+from app.database.db import SessionLocal, dispose_engine, init_engine
+from app.services.utils import search_contacts
+
+BENCH_USER = "search-bench"
+
+QUERIES = {
+    "prefix": ["ann", "ivan", "oles", "petr", "kov"],
+    "fuzzy": ["ivanvo", "petrneko", "olesandr", "kovalneko"],
+    "multi_field": ["ivan kov", "anna 050", "petro example.com", "olena vip"],
+}
+
+
+async def seed(rows: int) -> int:
+    async with SessionLocal() as db:
+        user_id = await db.scalar(text("SELECT id FROM users WHERE username = :name"), {"name": BENCH_USER})
+        if user_id is None:
+            user_id = await db.scalar(text(
+                "INSERT INTO users (username, email, password_hash, is_verified, created_at, updated_at) "
+                "VALUES (:name, :email, 'x', true, now(), now()) RETURNING id"
+            ), {"name": BENCH_USER, "email": f"{BENCH_USER}@example.com"})
+
+        existing = await db.scalar(text("SELECT count(*) FROM contacts WHERE user_id = :uid"), {"uid": user_id})
+        if existing < rows:
+            # generate_series заповнює таблицю на боці сервера, без передачі рядків через мережу
+            await db.execute(text("""
+                INSERT INTO contacts (first_name, last_name, email, phone, birthday, extra_info, user_id)
+                SELECT
+                    (ARRAY['Ivan', 'Anna', 'Petro', 'Olena', 'Oleksandr', 'Mariia'])[1 + g % 6],
+                    (ARRAY['Kovalenko', 'Shevchenko', 'Bondarenko', 'Tkachenko', 'Kravchenko'])[1 + (g / 7) % 5] || g,
+                    'contact' || g || '@example.com',
+                    '+38050' || lpad((g % 10000000)::text, 7, '0'),
+                    date '1970-01-01' + (g % 18000),
+                    CASE WHEN g % 10 = 0 THEN 'vip client' END,
+                    :uid
+                FROM generate_series(:start, :stop) AS g
+            """), {"uid": user_id, "start": existing + 1, "stop": rows})
+            await db.commit()
+            await db.execute(text("ANALYZE contacts"))
+        return user_id
+
+
+async def run(user_id: int, queries: int, limit: int):
+    results = {}
+    async with SessionLocal() as db:
+        for kind, terms in QUERIES.items():
+            timings = []
+            for _ in range(queries):
+                term = random.choice(terms)
+                start = time.perf_counter()
+                await search_contacts(db, user_id, term, None, limit)
+                timings.append((time.perf_counter() - start) * 1000)
+            timings.sort()
+            results[kind] = {
+                "p50_ms": round(statistics.median(timings), 2),
+                "p95_ms": round(timings[int(len(timings) * 0.95) - 1], 2),
+                "p99_ms": round(timings[int(len(timings) * 0.99) - 1], 2),
+            }
+    return results
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args()
+
+    init_engine()
+    user_id = await seed(args.rows)
+    for kind, stats in (await run(user_id, args.queries, args.limit)).items():
+        print(f"{kind:12} p50={stats['p50_ms']:8.2f} ms  p95={stats['p95_ms']:8.2f} ms  p99={stats['p99_ms']:8.2f} ms")
+    await dispose_engine()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
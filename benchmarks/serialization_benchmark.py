@@ -0,0 +1,101 @@
+"""
+Мікробенчмарк серіалізації списку контактів (за замовчуванням 10 000).
+
+Порівнює шлях FastAPI за замовчуванням (моделі -> model_dump -> валідація
+response_model -> jsonable-серіалізація -> json.dumps у JSONResponse) зі
+швидкими шляхами з app.services.serialization. База даних не потрібна:
+контакти будуються в пам'яті як ORM-об'єкти та Row-кортежі.
+
+Запуск:
+    python -m benchmarks.serialization_benchmark --contacts 10000 --repeat 20
+"""
+import argparse
+import random
+import statistics
+import time
+from datetime import date, datetime, timezone
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, ORJSONResponse
+from pydantic import TypeAdapter
+from sqlalchemy.engine import result_tuple
+
+from app.database.crud import CONTACT_FIELDS
+from app.database.models import Contact
+from app.database.schemas import ContactPage, ContactPartial, ContactResponse
+from app.services.serialization import dump_contacts, dump_rows
+
+
+def make_contacts(count: int, seed: int = 42):
+    rnd = random.Random(seed)
+    make_row = result_tuple(list(CONTACT_FIELDS))
+    rows, contacts = [], []
+    for i in range(1, count + 1):
+        values = {
+            "id": i,
+            "first_name": f"Name{i}",
+            "last_name": f"Surname{rnd.randint(1, 5000)}",
+            "email": f"user{i}@example.com",
+            "phone": f"+380{rnd.randint(100000000, 999999999)}",
+            "birthday": date(rnd.randint(1950, 2010), rnd.randint(1, 12), rnd.randint(1, 28)),
+            "extra_info": rnd.choice([None, "friend", "work", "family"]),
+            "user_id": 1,
+            "updated_at": datetime(2024, 1, 1, tzinfo=timezone.utc),
+        }
+        rows.append(make_row(tuple(values.values())))
+        contacts.append(Contact(**values))
+    return rows, contacts
+
+
+def default_page(rows) -> bytes:
+    # Як раніше в get_contacts: моделі в ендпоінті, далі серіалізація response_model у FastAPI
+    page = ContactPage(items=[ContactPartial(**row._asdict()) for row in rows], next_cursor=None)
+    content = TypeAdapter(ContactPage).validate_python(page.model_dump())
+    return JSONResponse(jsonable_encoder(content, exclude_unset=True)).body
+
+
+def default_list(contacts) -> bytes:
+    adapter = TypeAdapter(list[ContactResponse])
+    content = adapter.validate_python(contacts, from_attributes=True)
+    return JSONResponse(jsonable_encoder(adapter.dump_python(content, mode="json"))).body
+
+
+def orjson_response_list(contacts) -> bytes:
+    # Лише ORJSONResponse як default_response_class, без зміни ендпоінтів
+    adapter = TypeAdapter(list[ContactResponse])
+    content = adapter.validate_python(contacts, from_attributes=True)
+    return ORJSONResponse(adapter.dump_python(content, mode="json")).body
+
+
+def measure(fn, arg, repeat: int):
+    fn(arg)
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(arg)
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings), min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--contacts", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    rows, contacts = make_contacts(args.contacts)
+    cases = [
+        ("page: default (before)", default_page, rows),
+        ("page: dump_rows (after)", dump_rows, rows),
+        ("list: default (before)", default_list, contacts),
+        ("list: ORJSONResponse only", orjson_response_list, contacts),
+        ("list: dump_contacts (after)", dump_contacts, contacts),
+    ]
+    print(f"{args.contacts} contacts, {args.repeat} runs")
+    for name, fn, arg in cases:
+        median, best = measure(fn, arg, args.repeat)
+        print(f"{name:<30} median {median:8.2f} ms   min {best:8.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
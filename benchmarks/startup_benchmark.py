@@ -0,0 +1,132 @@
+"""
+Холодний старт застосунку.
+
+1. Імпорт: запускає `python -X importtime -c "import app.main"` в окремому процесі
+   і друкує загальний час імпорту та найважчі пакети (власний час, згрупований
+   за пакетом верхнього рівня).
+2. Time-to-first-request: --runs разів піднімає uvicorn і міряє час від запуску
+   процесу до першої успішної відповіді GET /.
+
+Lifespan створює engine і стартує воркери, тож потрібні DATABASE_URL і Redis,
+як для звичайного запуску. З --compare порівнює медіани з попереднім запуском
+і завершується з кодом 1, якщо старт повільнішав більше ніж на --threshold відсотків.
+
+Запуск:
+    python -m benchmarks.startup_benchmark --runs 5 --save benchmarks/results/startup.json
+    python -m benchmarks.startup_benchmark --compare benchmarks/results/startup.json
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+
+import httpx
+
+from benchmarks.load_test import git_commit
+
+
+def import_profile(module: str) -> tuple[float, list]:
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, check=True,
+    )
+    total_us = 0
+    by_package = defaultdict(int)
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        by_package[name.strip().split(".")[0]] += int(self_us)
+        if name.strip() == module:
+            total_us = int(cumulative_us)
+    heaviest = sorted(by_package.items(), key=lambda item: item[1], reverse=True)
+    return total_us / 1000, [(name, us / 1000) for name, us in heaviest]
+
+
+def first_request(port: int, timeout: float = 30) -> float:
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        env=os.environ.copy(),
+    )
+    try:
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if server.poll() is not None:
+                raise RuntimeError(f"uvicorn exited with code {server.returncode}")
+            try:
+                if httpx.get(f"http://127.0.0.1:{port}/", timeout=1).status_code == 200:
+                    return (time.perf_counter() - start) * 1000
+            except httpx.TransportError:
+                pass
+            time.sleep(0.01)
+        raise RuntimeError("Server did not become ready")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def compare(summary: dict, baseline_path: str, threshold: float) -> bool:
+    with open(baseline_path) as f:
+        baseline = json.load(f)["startup"]
+    regressed = False
+    print(f"\nvs {baseline_path}:")
+    for name, value in summary.items():
+        before = baseline.get(name)
+        if not before:
+            continue
+        change = (value - before) / before * 100
+        flag = change > threshold
+        regressed |= flag
+        print(f"{'REGRESSED' if flag else 'ok':<10}{name:<22}{before:>10} -> {value:<10}({change:+.1f}%)")
+    return regressed
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="app.main")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--skip-server", action="store_true", help="only profile imports")
+    parser.add_argument("--save", help="write results as JSON")
+    parser.add_argument("--compare", help="baseline JSON to compare medians against")
+    parser.add_argument("--threshold", type=float, default=15, help="allowed regression, percent")
+    args = parser.parse_args()
+
+    imports = [import_profile(args.module) for _ in range(args.runs)]
+    import_ms = statistics.median(total for total, _ in imports)
+    print(f"import {args.module}: {import_ms:.1f} ms (median of {args.runs})")
+    for name, ms in imports[-1][1][:args.top]:
+        print(f"  {name:<28}{ms:8.1f} ms")
+
+    summary = {"import_ms": round(import_ms, 1)}
+    if not args.skip_server:
+        timings = [first_request(args.port) for _ in range(args.runs)]
+        summary["first_request_ms"] = round(statistics.median(timings), 1)
+        print(f"time to first request: p50={summary['first_request_ms']} ms  max={max(timings):.1f} ms")
+
+    if args.save:
+        os.makedirs(os.path.dirname(args.save) or ".", exist_ok=True)
+        with open(args.save, "w") as f:
+            json.dump({
+                "commit": git_commit(),
+                "created_at": datetime.now(timezone.utc).isoformat(),
+                "params": {name: value for name, value in vars(args).items() if name not in ("save", "compare")},
+                "startup": summary,
+                "heaviest_imports_ms": dict((name, round(ms, 1)) for name, ms in imports[-1][1][:args.top]),
+            }, f, indent=2)
+        print(f"Saved to {args.save}")
+
+    if args.compare and compare(summary, args.compare, args.threshold):
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,64 @@
+"""
+Бенчмарк перевірки JWT з кешем claims і без нього.
+
+Міряє на --tokens різних токенах (--rounds проходів):
+  * verify_token з теплим кешем - так працює get_current_user для активних клієнтів;
+  * перевірку підпису без кешу для налаштованого settings.jwt_algorithm;
+  * сирий jwt.decode для HS256 і RS256 (ключ RSA генерується на льоту) -
+    щоб оцінити, скільки коштує перехід на асиметричні ключі.
+
+Запуск:
+    python -m benchmarks.token_benchmark --tokens 1000 --rounds 5
+"""
+import argparse
+import time
+from datetime import datetime, timedelta
+
+import rsa
+from jose import jwk, jwt
+
+from app.config import settings
+from app.services import tokens
+
+
+def measure(fn, items, rounds: int) -> float:
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for item in items:
+            fn(item)
+    return (time.perf_counter() - start) / (rounds * len(items)) * 1_000_000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tokens", type=int, default=1000)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    issued = [tokens.create_token(f"user{i}@example.com", tokens.ACCESS, timedelta(minutes=30)) for i in range(args.tokens)]
+    for token in issued:
+        tokens.verify_token(token)
+
+    results = [
+        (f"{settings.jwt_algorithm} verify_token, cached", measure(tokens.verify_token, issued, args.rounds)),
+        (f"{settings.jwt_algorithm} verify_token, no cache", measure(tokens._decode, issued, args.rounds)),
+    ]
+
+    claims = [{"sub": f"user{i}@example.com", "exp": datetime.utcnow() + timedelta(minutes=30)} for i in range(args.tokens)]
+    secret = "benchmark-secret"
+    hs256 = [jwt.encode(c, secret, algorithm="HS256") for c in claims]
+    results.append(("HS256 jwt.decode", measure(lambda t: jwt.decode(t, secret, algorithms=["HS256"]), hs256, args.rounds)))
+
+    public, private = rsa.newkeys(2048)
+    private_pem = private.save_pkcs1().decode()
+    public_key = jwk.construct(public.save_pkcs1().decode(), "RS256")
+    rs256 = [jwt.encode(c, private_pem, algorithm="RS256") for c in claims]
+    results.append(("RS256 jwt.decode", measure(lambda t: jwt.decode(t, public_key, algorithms=["RS256"]), rs256, args.rounds)))
+
+    print(f"{args.tokens} tokens x {args.rounds} rounds")
+    for name, micros in results:
+        print(f"{name:<36} {micros:10.1f} us/token")
+
+
+if __name__ == "__main__":
+    main()